@@ -0,0 +1,69 @@
+# File: mini_insta/counters.py
+# Author: María Díaz Garrido
+# Description: Keeps the denormalized Profile counters (num_followers,
+#              num_following, num_posts) in step with the Follow and Post
+#              tables. The signal receivers in mini_insta/signals.py call these
+#              on every insert and delete; recount_profiles() rebuilds them
+#              from scratch for the repair command.
+
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Follow, Post, Profile
+
+
+def _bump(profile_id, field, delta):
+    """Add delta to one counter with a single UPDATE (never below zero)."""
+    value = F(field) + delta if delta > 0 else Greatest(F(field) + delta, Value(0))
+    Profile.objects.filter(pk=profile_id).update(**{field: value})
+
+
+def follow_added(follow):
+    _bump(follow.profile_id, "num_followers", 1)
+    _bump(follow.follower_profile_id, "num_following", 1)
+
+
+def follow_removed(follow):
+    _bump(follow.profile_id, "num_followers", -1)
+    _bump(follow.follower_profile_id, "num_following", -1)
+
+
+def post_added(post):
+    _bump(post.profile_id, "num_posts", 1)
+
+
+def post_removed(post):
+    _bump(post.profile_id, "num_posts", -1)
+
+
+def _count(model, field):
+    """Subquery counting the rows of `model` whose `field` is the outer profile."""
+    counts = (
+        model.objects.filter(**{field: OuterRef("pk")})
+                     .order_by()
+                     .values(field)
+                     .annotate(c=Count("pk"))
+                     .values("c")
+    )
+    return Coalesce(Subquery(counts), 0)
+
+
+def recount_profiles(profiles=None):
+    """Recompute every counter from Follow and Post. Returns the number of profiles fixed."""
+    qs = Profile.objects.all() if profiles is None else profiles
+    with transaction.atomic():
+        actual = qs.annotate(
+            actual_followers=_count(Follow, "profile"),
+            actual_following=_count(Follow, "follower_profile"),
+            actual_posts=_count(Post, "profile"),
+        ).values_list("pk", "num_followers", "num_following", "num_posts",
+                      "actual_followers", "actual_following", "actual_posts")
+        fixed = 0
+        for pk, followers, following, posts, *counts in actual:
+            if [followers, following, posts] != counts:
+                Profile.objects.filter(pk=pk).update(
+                    num_followers=counts[0], num_following=counts[1], num_posts=counts[2],
+                )
+                fixed += 1
+    return fixed
@@ -16,7 +16,7 @@ class UpdateProfileForm(forms.ModelForm):
     '''A form to update the profile'''
     class Meta:
         model = Profile
-        exclude = ("username", "join_date")
+        exclude = ("username", "join_date", "num_followers", "num_following", "num_posts", "fragment_version", "timeline_pulled")
        
        
 class CreateProfileForm(forms.ModelForm):
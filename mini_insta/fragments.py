@@ -0,0 +1,73 @@
+# File: mini_insta/fragments.py
+# Author: María Díaz Garrido
+# Description: Versions of the cached template fragments of mini_insta
+#              (profile headers and post cards). Post and Profile carry a
+#              fragment_version column that the templates put in their
+#              {% cache %} keys; the signal receivers bump it with an F()
+#              update in the same transaction as the change, so every process
+#              sees it whatever cache backend is configured. Views load just
+#              the keys of a page first and fetch full post details only for
+#              the cards missing from the cache.
+#              Fragments also expire after MINI_INSTA_FRAGMENT_TIMEOUT seconds
+#              (default 600), which bounds how long a renamed liker or
+#              commenter can show up under the old name.
+
+from django.conf import settings
+from django.core.cache import InvalidCacheBackendError, caches
+from django.core.cache.utils import make_template_fragment_key
+from django.db.models import F
+
+from .models import Post, Profile, with_post_details
+
+
+# What a post card needs before its fragments are looked up: the cache key
+# (pk, fragment_version) and what the like button outside it reads.
+CARD_KEY_FIELDS = ("profile", "created", "fragment_version")
+
+
+def fragment_timeout():
+    return getattr(settings, "MINI_INSTA_FRAGMENT_TIMEOUT", 600)
+
+
+def fragment_cache():
+    """The cache {% cache %} writes to (same lookup as the template tag)."""
+    try:
+        return caches["template_fragments"]
+    except InvalidCacheBackendError:
+        return caches["default"]
+
+
+def bump_posts(*post_ids):
+    Post.objects.filter(pk__in=[pk for pk in post_ids if pk is not None]).update(
+        fragment_version=F("fragment_version") + 1
+    )
+
+
+def bump_profile(profile_id):
+    """After a profile edit: its header, and every card showing it as author."""
+    Profile.objects.filter(pk=profile_id).update(fragment_version=F("fragment_version") + 1)
+    Post.objects.filter(profile_id=profile_id).update(fragment_version=F("fragment_version") + 1)
+
+
+def card_keys(posts):
+    """Post.objects...only() the fields needed to look the cards up."""
+    return posts.only(*CARD_KEY_FIELDS)
+
+
+def load_cards(posts, *fragment_names):
+    """Swap the posts whose fragments are not all cached for fully loaded ones.
+
+    `posts` come from card_keys(); the ones missing any of fragment_names
+    (for key post.pk, post.fragment_version) are reloaded in one
+    with_post_details() query, the rest render straight from the cache.
+    """
+    keys = {
+        post.pk: [make_template_fragment_key(name, [post.pk, post.fragment_version]) for name in fragment_names]
+        for post in posts
+    }
+    cached = fragment_cache().get_many([key for post_keys in keys.values() for key in post_keys])
+    missing = [pk for pk, post_keys in keys.items() if not all(key in cached for key in post_keys)]
+    if not missing:
+        return list(posts)
+    loaded = with_post_details(Post.objects.filter(pk__in=missing)).in_bulk()
+    return [loaded.get(post.pk, post) for post in posts]
@@ -0,0 +1,187 @@
+# File: mini_insta/graph.py
+# Author: María Díaz Garrido
+# Description: In-memory follower graph. Every process keeps, per profile id,
+#              sorted integer arrays of the ids it follows and of the ids
+#              following it, built from Follow in one query. Follow and unfollow
+#              update this process's copy in place (see signals.py), and the
+#              whole graph is rebuilt every MINI_INSTA_GRAPH_MAX_AGE seconds
+#              (default 300) to pick up changes made by other processes.
+#              Answers friends-of-friends suggestions, mutual followers and
+#              follow distance without multi-hop joins.
+
+import threading
+import time
+from array import array
+from bisect import bisect_left, insort
+from collections import Counter
+
+from django.conf import settings
+
+from .models import Follow, Profile
+
+
+EMPTY = array("L")
+
+
+def _max_age():
+    return getattr(settings, "MINI_INSTA_GRAPH_MAX_AGE", 300)
+
+
+class FollowGraph:
+    """Adjacency arrays over Follow: following[a] and followers[a], both sorted."""
+
+    def __init__(self, edges=()):
+        self.following = {}
+        self.followers = {}
+        self.built = time.monotonic()
+        for follower, followed in edges:
+            self.following.setdefault(follower, array("L")).append(followed)
+            self.followers.setdefault(followed, array("L")).append(follower)
+        for adjacency in (self.following, self.followers):
+            for node, ids in adjacency.items():
+                adjacency[node] = array("L", sorted(ids))
+
+    @classmethod
+    def load(cls):
+        return cls(Follow.objects.values_list("follower_profile_id", "profile_id").iterator(chunk_size=5000))
+
+    # --- incremental updates -------------------------------------------------
+
+    @staticmethod
+    def _insert(adjacency, node, value):
+        ids = adjacency.setdefault(node, array("L"))
+        i = bisect_left(ids, value)
+        if i == len(ids) or ids[i] != value:
+            insort(ids, value)
+
+    @staticmethod
+    def _remove(adjacency, node, value):
+        ids = adjacency.get(node, EMPTY)
+        i = bisect_left(ids, value)
+        if i < len(ids) and ids[i] == value:
+            del ids[i]
+
+    def add_edge(self, follower, followed):
+        self._insert(self.following, follower, followed)
+        self._insert(self.followers, followed, follower)
+
+    def remove_edge(self, follower, followed):
+        self._remove(self.following, follower, followed)
+        self._remove(self.followers, followed, follower)
+
+    # --- queries -----------------------------------------------------------
+
+    def follows(self, a, b):
+        ids = self.following.get(a, EMPTY)
+        i = bisect_left(ids, b)
+        return i < len(ids) and ids[i] == b
+
+    def mutual_followers(self, viewer, target):
+        """Sorted ids of the profiles `viewer` follows that also follow `target`."""
+        return sorted(set(self.following.get(viewer, EMPTY)).intersection(self.followers.get(target, EMPTY)))
+
+    def mutual_follows(self, a):
+        """Sorted ids of the profiles that `a` follows and that follow `a` back."""
+        return sorted(set(self.following.get(a, EMPTY)).intersection(self.followers.get(a, EMPTY)))
+
+    def suggestions(self, viewer, limit=10):
+        """[(profile_id, mutual_count)] of friends of friends, most shared first.
+
+        mutual_count is how many of the profiles `viewer` follows follow the
+        suggested one; profiles already followed (and viewer) are left out.
+        """
+        followed = self.following.get(viewer, EMPTY)
+        skip = set(followed)
+        skip.add(viewer)
+        counts = Counter()
+        for friend in followed:
+            counts.update(fof for fof in self.following.get(friend, EMPTY) if fof not in skip)
+        return sorted(counts.items(), key=lambda item: (-item[1], item[0]))[:limit]
+
+    def distance(self, a, b, max_depth=6):
+        """Fewest follow hops from a to b (0 for a == b), or None beyond max_depth.
+
+        Breadth-first from both ends, expanding the smaller frontier each step.
+        """
+        if a == b:
+            return 0
+        forward, backward = {a}, {b}
+        seen_forward, seen_backward = {a}, {b}
+        for depth in range(1, max_depth + 1):
+            if len(forward) <= len(backward):
+                forward = {n for node in forward for n in self.following.get(node, EMPTY)} - seen_forward
+                if forward & seen_backward:
+                    return depth
+                seen_forward |= forward
+            else:
+                backward = {n for node in backward for n in self.followers.get(node, EMPTY)} - seen_backward
+                if backward & seen_forward:
+                    return depth
+                seen_backward |= backward
+            if not forward or not backward:
+                return None
+        return None
+
+
+_local = {"graph": None}
+_lock = threading.Lock()
+
+
+def follow_graph():
+    """This process's FollowGraph, (re)built when missing or too old."""
+    graph = _local["graph"]
+    if graph is not None and time.monotonic() - graph.built < _max_age():
+        return graph
+    with _lock:
+        graph = _local["graph"]
+        if graph is None or time.monotonic() - graph.built >= _max_age():
+            graph = _local["graph"] = FollowGraph.load()
+    return graph
+
+
+def follow_added(follow):
+    with _lock:
+        if _local["graph"] is not None:
+            _local["graph"].add_edge(follow.follower_profile_id, follow.profile_id)
+
+
+def follow_removed(follow):
+    with _lock:
+        if _local["graph"] is not None:
+            _local["graph"].remove_edge(follow.follower_profile_id, follow.profile_id)
+
+
+def profiles_by_id(ids):
+    """Profiles for ids, in the order of ids, in one query."""
+    found = Profile.objects.in_bulk(ids)
+    return [found[pk] for pk in ids if pk in found]
+
+
+def suggested_profiles(viewer, limit=5):
+    """Friends-of-friends of viewer as Profiles, each with .mutual_count set."""
+    ranked = follow_graph().suggestions(viewer.pk, limit)
+    counts = dict(ranked)
+    profiles = profiles_by_id([pk for pk, count in ranked])
+    for profile in profiles:
+        profile.mutual_count = counts[profile.pk]
+    return profiles
+
+
+def relationship(viewer, target, sample=3):
+    """How viewer relates to target, for "Followed by X and N others you follow".
+
+    Returns a dict with the total number of mutual followers, up to `sample`
+    of them as Profiles and how many more there are, whether each follows the other and the follow
+    distance from viewer to target (None when not connected).
+    """
+    graph = follow_graph()
+    mutual = graph.mutual_followers(viewer.pk, target.pk)
+    shown = profiles_by_id(mutual[:sample])
+    return {
+        "mutual_count": len(mutual),
+        "mutual_sample": shown,
+        "mutual_others": len(mutual) - len(shown),
+        "you_follow": graph.follows(viewer.pk, target.pk),
+        "follows_you": graph.follows(target.pk, viewer.pk),
+        "distance": graph.distance(viewer.pk, target.pk),
+    }
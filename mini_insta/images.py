@@ -0,0 +1,121 @@
+# File: mini_insta/images.py
+# Author: María Díaz Garrido
+# Description: Resized renditions of uploaded photos. After a Photo with an
+#              image_file is saved, a background thread pool turns the
+#              original into "thumb", "feed" and "full" WebP (or AVIF) files
+#              without EXIF/GPS metadata, and records their paths on
+#              Photo.renditions. Until they exist, Photo.get_image_url() gives
+#              a placeholder; the original upload is never served.
+#              Settings: MINI_INSTA_IMAGE_WORKERS (0 = process in the request),
+#              MINI_INSTA_IMAGE_FORMAT ("WEBP" or "AVIF").
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+
+from . import fragments
+
+
+logger = logging.getLogger(__name__)
+
+# longest edge in pixels of each rendition
+RENDITIONS = {"thumb": 320, "feed": 1080, "full": 2048}
+EXTENSIONS = {"WEBP": "webp", "AVIF": "avif"}
+QUALITY = 80
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _workers():
+    return getattr(settings, "MINI_INSTA_IMAGE_WORKERS", 2)
+
+
+def _format():
+    fmt = getattr(settings, "MINI_INSTA_IMAGE_FORMAT", "WEBP").upper()
+    return fmt if fmt in EXTENSIONS else "WEBP"
+
+
+def _executor():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=_workers(), thread_name_prefix="mini_insta_images")
+    return _pool
+
+
+def rendition_path(photo_id, name, fmt):
+    return f"photos/renditions/{photo_id}/{name}.{EXTENSIONS[fmt]}"
+
+
+def make_renditions(photo):
+    """Write every rendition of photo.image_file and return {name: storage path}."""
+    from PIL import Image, ImageOps
+
+    storage = photo.image_file.storage
+    fmt = _format()
+    with photo.image_file.open("rb") as f:
+        original = Image.open(f)
+        # apply the EXIF orientation, then drop all metadata with it
+        original = ImageOps.exif_transpose(original)
+        original.load()
+    if original.mode not in ("RGB", "RGBA"):
+        original = original.convert("RGBA" if "A" in original.getbands() else "RGB")
+
+    paths = {}
+    for name, edge in RENDITIONS.items():
+        image = original.copy()
+        image.thumbnail((edge, edge), Image.Resampling.LANCZOS)
+        buffer = BytesIO()
+        image.save(buffer, fmt, quality=QUALITY)
+        path = rendition_path(photo.pk, name, fmt)
+        if storage.exists(path):
+            storage.delete(path)
+        paths[name] = storage.save(path, ContentFile(buffer.getvalue()))
+    return paths
+
+
+def process_photo(photo_id):
+    """Create the renditions of one Photo; errors are logged, not raised."""
+    from .models import Photo
+
+    try:
+        photo = Photo.objects.filter(pk=photo_id).first()
+        if photo is None or not photo.image_file:
+            return
+        paths = make_renditions(photo)
+        # update() so the auto_now timestamp and the save signals stay put
+        Photo.objects.filter(pk=photo_id).update(renditions=paths)
+        fragments.bump_posts(photo.post_id)
+    except Exception:
+        logger.exception("could not make renditions for Photo %s", photo_id)
+    finally:
+        if _workers() > 0:
+            connection.close()  # worker threads do not go through request_finished
+
+
+def schedule_renditions(photo):
+    """Queue the renditions of a saved Photo once its transaction commits."""
+    if _workers() <= 0:
+        transaction.on_commit(lambda: process_photo(photo.pk))
+    else:
+        transaction.on_commit(lambda: _executor().submit(process_photo, photo.pk))
+
+
+def delete_renditions(photo):
+    """Delete the rendition files of a deleted Photo once the delete commits
+    (a rolled-back delete leaves the row, which still needs them)."""
+    storage = photo.image_file.storage
+    paths = list((photo.renditions or {}).values())
+
+    def delete():
+        for path in paths:
+            if storage.exists(path):
+                storage.delete(path)
+
+    transaction.on_commit(delete)
@@ -0,0 +1,27 @@
+# File: mini_insta/management/commands/make_photo_renditions.py
+# Author: María Díaz Garrido
+# Description: `python manage.py make_photo_renditions` creates the resized
+#              renditions of uploaded photos that do not have them yet (photos
+#              from before the pipeline, or whose background job was lost
+#              when the server stopped). --all redoes every photo.
+
+from django.core.management.base import BaseCommand
+
+from mini_insta.images import process_photo
+from mini_insta.models import Photo
+
+
+class Command(BaseCommand):
+    help = "Create missing thumb/feed/full renditions of uploaded photos."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true", help="regenerate renditions of every uploaded photo")
+
+    def handle(self, *args, **options):
+        photos = Photo.objects.exclude(image_file="").exclude(image_file__isnull=True)
+        if not options["all"]:
+            photos = photos.filter(renditions={})
+        photo_ids = list(photos.values_list("pk", flat=True))
+        for photo_id in photo_ids:
+            process_photo(photo_id)
+        self.stdout.write(self.style.SUCCESS(f"Processed {len(photo_ids)} photo(s)"))
@@ -0,0 +1,17 @@
+# File: mini_insta/management/commands/rebuild_search_index.py
+# Author: María Díaz Garrido
+# Description: `python manage.py rebuild_search_index` recreates the
+#              SearchDocument row of every Profile and Post, e.g. after bulk
+#              creates or queryset updates that bypass the signals.
+
+from django.core.management.base import BaseCommand
+
+from mini_insta.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Recreate the full-text search documents of every profile and post."
+
+    def handle(self, *args, **options):
+        documents = rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {documents} document(s)"))
@@ -0,0 +1,27 @@
+# File: mini_insta/management/commands/rebuild_timelines.py
+# Author: María Díaz Garrido
+# Description: `python manage.py rebuild_timelines` recreates the materialized
+#              home timelines from the Follow and Post tables, e.g. after a
+#              bulk load or a change of MINI_INSTA_FANOUT_LIMIT (which profiles
+#              are pulled instead of fanned out is recomputed first).
+
+from django.core.management.base import BaseCommand
+
+from mini_insta.models import Profile
+from mini_insta.timeline import BACKFILL_POSTS, rebuild_timeline, reset_pull_modes
+
+
+class Command(BaseCommand):
+    help = "Rebuild the TimelineEntry rows of every profile."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--posts", type=int, default=BACKFILL_POSTS,
+                            help="latest posts per followed profile to copy (default: %(default)s)")
+
+    def handle(self, *args, **options):
+        reset_pull_modes()
+        profiles = 0
+        for profile in Profile.objects.all().iterator():
+            rebuild_timeline(profile, options["posts"])
+            profiles += 1
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {profiles} timeline(s)"))
@@ -0,0 +1,17 @@
+# File: mini_insta/management/commands/repair_profile_counters.py
+# Author: María Díaz Garrido
+# Description: `python manage.py repair_profile_counters` recomputes the
+#              follower, following and post counters of every Profile, e.g.
+#              after bulk edits or fixture loads that bypass the signals.
+
+from django.core.management.base import BaseCommand
+
+from mini_insta.counters import recount_profiles
+
+
+class Command(BaseCommand):
+    help = "Recompute the denormalized follower/following/post counters on Profile."
+
+    def handle(self, *args, **options):
+        fixed = recount_profiles()
+        self.stdout.write(self.style.SUCCESS(f"{fixed} profile(s) had wrong counters and were repaired"))
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:18
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_counters(apps, schema_editor):
+    """Set the new counters from the existing Follow and Post rows."""
+    Profile = apps.get_model("mini_insta", "Profile")
+    Follow = apps.get_model("mini_insta", "Follow")
+    Post = apps.get_model("mini_insta", "Post")
+
+    followers = dict(Follow.objects.values_list("profile").annotate(c=Count("pk")).order_by())
+    following = dict(Follow.objects.values_list("follower_profile").annotate(c=Count("pk")).order_by())
+    posts = dict(Post.objects.values_list("profile").annotate(c=Count("pk")).order_by())
+    for profile in Profile.objects.all():
+        Profile.objects.filter(pk=profile.pk).update(
+            num_followers=followers.get(profile.pk, 0),
+            num_following=following.get(profile.pk, 0),
+            num_posts=posts.get(profile.pk, 0),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mini_insta', '0012_alter_profile_user_follow_unique_follow_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='num_followers',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='num_following',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='num_posts',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+BACKFILL_POSTS = 100
+FANOUT_LIMIT = 1000
+
+
+def fill_timelines(apps, schema_editor):
+    """Copy the latest posts of every followed profile into its followers' timelines."""
+    Follow = apps.get_model("mini_insta", "Follow")
+    Post = apps.get_model("mini_insta", "Post")
+    TimelineEntry = apps.get_model("mini_insta", "TimelineEntry")
+
+    latest = {}
+    for follow in Follow.objects.filter(profile__num_followers__lte=FANOUT_LIMIT).iterator():
+        if follow.profile_id not in latest:
+            latest[follow.profile_id] = list(
+                Post.objects.filter(profile_id=follow.profile_id)
+                            .order_by("-published", "-id")
+                            .values_list("pk", "published")[:BACKFILL_POSTS]
+            )
+        TimelineEntry.objects.bulk_create(
+            [
+                TimelineEntry(owner_id=follow.follower_profile_id, post_id=pk,
+                              author_id=follow.profile_id, published=published)
+                for pk, published in latest[follow.profile_id]
+            ],
+            batch_size=1000, ignore_conflicts=True,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mini_insta', '0013_profile_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TimelineEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('published', models.DateTimeField()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='timelineentry',
+            name='author',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='mini_insta.profile'),
+        ),
+        migrations.AddField(
+            model_name='timelineentry',
+            name='owner',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline_entries', to='mini_insta.profile'),
+        ),
+        migrations.AddField(
+            model_name='timelineentry',
+            name='post',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline_entries', to='mini_insta.post'),
+        ),
+        migrations.AddIndex(
+            model_name='timelineentry',
+            index=models.Index(fields=['owner', '-published', '-post'], name='timeline_owner_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='timelineentry',
+            index=models.Index(fields=['owner', 'author'], name='timeline_owner_author_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='timelineentry',
+            constraint=models.UniqueConstraint(fields=('owner', 'post'), name='unique_timeline_entry'),
+        ),
+        migrations.RunPython(fill_timelines, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,95 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:23
+
+from django.db import migrations, models
+
+
+FTS_TABLE = "mini_insta_searchdocument_fts"
+DOC_TABLE = "mini_insta_searchdocument"
+
+SQLITE_CREATE = [
+    # external-content FTS5 table: it stores only the index, not the text
+    f"""CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        title, body, content='{DOC_TABLE}', content_rowid='id', prefix='2 3'
+    )""",
+    f"""CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON {DOC_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END""",
+    f"""CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON {DOC_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, body) VALUES ('delete', old.id, old.title, old.body);
+    END""",
+    f"""CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE OF title, body ON {DOC_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, body) VALUES ('delete', old.id, old.title, old.body);
+        INSERT INTO {FTS_TABLE}(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END""",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+SQLITE_DROP = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ai",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_au",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+PG_CREATE = [
+    f"""CREATE INDEX searchdocument_fts_idx ON {DOC_TABLE} USING GIN (
+        (setweight(to_tsvector('simple', coalesce(title, '')), 'A') ||
+         setweight(to_tsvector('simple', coalesce(body, '')), 'B'))
+    )""",
+]
+PG_DROP = ["DROP INDEX IF EXISTS searchdocument_fts_idx"]
+
+
+def _run(schema_editor, statements):
+    for sql in statements.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(sql)
+
+
+def fill_documents(apps, schema_editor):
+    """One SearchDocument per existing Profile and Post."""
+    Profile = apps.get_model("mini_insta", "Profile")
+    Post = apps.get_model("mini_insta", "Post")
+    SearchDocument = apps.get_model("mini_insta", "SearchDocument")
+
+    docs = [
+        SearchDocument(kind="profile", object_id=p.pk, title=f"{p.username} {p.display_name}", body=p.bio_text)
+        for p in Profile.objects.all()
+    ]
+    docs += [
+        SearchDocument(kind="post", object_id=pk, title="", body=caption)
+        for pk, caption in Post.objects.values_list("pk", "caption")
+    ]
+    SearchDocument.objects.bulk_create(docs, batch_size=1000)
+
+
+def create_search_index(apps, schema_editor):
+    _run(schema_editor, {"sqlite": SQLITE_CREATE, "postgresql": PG_CREATE})
+
+
+def drop_search_index(apps, schema_editor):
+    _run(schema_editor, {"sqlite": SQLITE_DROP, "postgresql": PG_DROP})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mini_insta', '0014_timelineentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('profile', 'Profile'), ('post', 'Post')], max_length=10)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('title', models.TextField(blank=True)),
+                ('body', models.TextField(blank=True)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='searchdocument',
+            constraint=models.UniqueConstraint(fields=('kind', 'object_id'), name='unique_search_document'),
+        ),
+        migrations.RunPython(fill_documents, migrations.RunPython.noop),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
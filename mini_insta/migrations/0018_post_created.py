@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:02
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def fill_created(apps, schema_editor):
+    """Existing posts were never timestamped at creation; their last publish
+    time is the closest value we have. Timeline copies follow the posts."""
+    Post = apps.get_model("mini_insta", "Post")
+    TimelineEntry = apps.get_model("mini_insta", "TimelineEntry")
+    Post.objects.update(created=models.F("published"))
+    TimelineEntry.objects.update(
+        created=models.Subquery(Post.objects.filter(pk=models.OuterRef("post_id")).values("created")[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mini_insta', '0017_follow_list_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='created',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RemoveIndex(
+            model_name='timelineentry',
+            name='timeline_owner_idx',
+        ),
+        migrations.RenameField(
+            model_name='timelineentry',
+            old_name='published',
+            new_name='created',
+        ),
+        migrations.RunPython(fill_created, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='timelineentry',
+            index=models.Index(fields=['owner', '-created', '-post'], name='timeline_owner_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['profile', '-created', '-id'], name='post_profile_created_idx'),
+        ),
+    ]
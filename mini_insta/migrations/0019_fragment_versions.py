@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mini_insta', '0018_post_created'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='fragment_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='fragment_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
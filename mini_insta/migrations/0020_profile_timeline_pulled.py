@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:12
+
+from django.db import migrations, models
+
+
+FANOUT_LIMIT = 1000
+
+
+def mark_pulled_profiles(apps, schema_editor):
+    """Profiles over the fan-out limit were already pulled by follower count."""
+    Profile = apps.get_model("mini_insta", "Profile")
+    Profile.objects.filter(num_followers__gt=FANOUT_LIMIT).update(timeline_pulled=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mini_insta', '0019_fragment_versions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='timeline_pulled',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(mark_pulled_profiles, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:17
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def fill_created(apps, schema_editor):
+    """Existing follows were never timestamped at creation; their last save
+    time is the closest value we have."""
+    Follow = apps.get_model("mini_insta", "Follow")
+    Follow.objects.update(created=models.F("timestamp"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mini_insta', '0020_profile_timeline_pulled'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='follow',
+            name='follow_followers_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='follow',
+            name='follow_following_idx',
+        ),
+        migrations.AddField(
+            model_name='follow',
+            name='created',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_created, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='follow',
+            index=models.Index(fields=['profile', '-created', '-id'], name='follow_followers_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='follow',
+            index=models.Index(fields=['follower_profile', '-created', '-id'], name='follow_following_idx'),
+        ),
+    ]
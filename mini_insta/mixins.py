@@ -1,6 +1,7 @@
 # mini_insta/mixins.py
 from django.contrib.auth.mixins import LoginRequiredMixin
-from .models import Profile
+from .fragments import fragment_timeout, load_cards
+from .relations import current_profile, viewer_relations
 from django.http import Http404
 
 
@@ -10,11 +11,10 @@ class AuthProfileMixin(LoginRequiredMixin):
     redirect_field_name = "next"    
 
     def get_current_profile(self):
-        user = self.request.user
-        qs = Profile.objects.filter(user=user).order_by("pk")
-        if not qs.exists():
+        profile = current_profile(self.request)
+        if profile is None:
             raise Http404("No Profile associated with this user.")
-        return qs.first()
+        return profile
 
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
@@ -24,4 +24,68 @@ class AuthProfileMixin(LoginRequiredMixin):
 
 class CurrentUserProfileObjectMixin(AuthProfileMixin):
     def get_object(self, queryset=None):
-        return self.get_current_profile()
\ No newline at end of file
+        return self.get_current_profile()
+
+class PostPagesMixin:
+    """Newest-first cursor pages of posts with an infinite-scroll fragment.
+
+    The view sets self.next_cursor when it loads a page. ?cursor= picks the
+    page and ?fragment=1 renders only fragment_template_name (the post cards
+    plus the link to the next page), which the page appends as it scrolls.
+    """
+    page_size = 20
+    fragment_template_name = None
+    next_cursor = None
+
+    def is_fragment(self):
+        return bool(self.request.GET.get("fragment")) and self.fragment_template_name is not None
+
+    def get_template_names(self):
+        if self.is_fragment():
+            return [self.fragment_template_name]
+        return super().get_template_names()
+
+    def page_url(self, cursor, fragment=False):
+        params = self.request.GET.copy()
+        params.pop("fragment", None)
+        params["cursor"] = cursor
+        if fragment:
+            params["fragment"] = "1"
+        return "?" + params.urlencode()
+
+    def get_context_data(self, **kwargs):
+        ctx = super().get_context_data(**kwargs)
+        if self.next_cursor:
+            ctx["next_url"] = self.page_url(self.next_cursor)
+            ctx["next_fragment_url"] = self.page_url(self.next_cursor, fragment=True)
+        return ctx
+
+
+class ViewerRelationsMixin:
+    """Gives the view self.relations (the viewer's likes and follows, loaded
+    in bulk) and puts the viewing profile in the context as `viewer`."""
+
+    @property
+    def relations(self):
+        return viewer_relations(self.request)
+
+    def get_context_data(self, **kwargs):
+        ctx = super().get_context_data(**kwargs)
+        ctx["viewer"] = self.relations.viewer
+        return ctx
+
+
+class FragmentCacheMixin:
+    """Puts fragment_timeout in the context for the {% cache %} blocks of
+    post cards and profile headers. The view loads its posts with
+    fragments.card_keys() and passes them through cached_cards(), which
+    fetches full details only for cards missing one of card_fragments."""
+    card_fragments = ()
+
+    def cached_cards(self, posts):
+        return load_cards(posts, *self.card_fragments)
+
+    def get_context_data(self, **kwargs):
+        ctx = super().get_context_data(**kwargs)
+        ctx["fragment_timeout"] = fragment_timeout()
+        return ctx
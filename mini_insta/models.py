@@ -9,11 +9,32 @@ from django.db import models
 from django.urls import reverse
 from django.conf import settings
 from django.contrib.auth.models import User
-from django.db.models import F, Q
+from django.db.models import Count, F, Prefetch, Q
+
+from .pagination import keyset_page
 
 
 # Create your models here.
-class Profile(models.Model):
+class FUpdatedFieldsMixin:
+    """save() leaves the F_UPDATED_FIELDS of an existing row alone.
+
+    Those columns are only changed with F() updates; the instance may have
+    been loaded before one of them ran, so writing every column would put
+    the stale values back.
+    """
+    F_UPDATED_FIELDS = ()
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get("update_fields") is None and not kwargs.get("force_insert"):
+            skipped = set(self.F_UPDATED_FIELDS) | self.get_deferred_fields()
+            kwargs["update_fields"] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.attname not in skipped and f.name not in skipped
+            ]
+        super().save(*args, **kwargs)
+
+
+class Profile(FUpdatedFieldsMixin, models.Model):
     "Encapsulate the data of a mini insta"
     
     #define the data attributes of the Mini_insta object
@@ -24,7 +45,22 @@ class Profile(models.Model):
     bio_text=models.TextField(blank=True)
     profile_image_url=models.URLField(blank=True)
     join_date= models.DateTimeField(auto_now=True)
-    
+
+    # denormalized counters, kept in step by mini_insta.counters
+    # (repair with `manage.py repair_profile_counters`)
+    num_followers = models.PositiveIntegerField(default=0)
+    num_following = models.PositiveIntegerField(default=0)
+    num_posts = models.PositiveIntegerField(default=0)
+
+    # bumped on every edit of the profile, for its cached header (mini_insta.fragments)
+    fragment_version = models.PositiveIntegerField(default=0)
+
+    # posts are pulled into timelines instead of fanned out (mini_insta.timeline)
+    timeline_pulled = models.BooleanField(default=False)
+
+    # only ever written with queryset updates (counters.py, fragments.py, timeline.py)
+    F_UPDATED_FIELDS = ("num_followers", "num_following", "num_posts", "fragment_version", "timeline_pulled")
+
     def __str__(self):
         "Return a string representation of this model instance"
         return f'{self.username}' 
@@ -35,7 +71,7 @@ class Profile(models.Model):
     
     def get_all_posts(self):
         "Return all posts for this profile"
-        posts = Post.objects.filter(profile=self).order_by('-published')
+        posts = Post.objects.filter(profile=self).order_by('-created', '-id')
         return posts
     
     def get_followers(self):
@@ -44,10 +80,16 @@ class Profile(models.Model):
         qs = (Follow.objects.filter(profile=self).select_related('follower_profile'))         
         return [f.follower_profile for f in qs]                  
 
+    def get_followers_page(self, page_size, cursor=None):
+        """One page of followers, most recent first: (profiles, next_cursor).
+
+        Each Profile carries only what a list row shows, plus followed_since.
+        """
+        return _follow_page(Follow.objects.filter(profile=self), "follower_profile", page_size, cursor)
+
     def get_num_followers(self):
-        """Return the COUNT of followers of this profile."""
-        from .models import Follow
-        return Follow.objects.filter(profile=self).count()
+        """Return the number of followers of this profile (stored counter)."""
+        return self.num_followers
 
     def get_following(self):
         """Return a LIST of Profile objects that this profile is following."""
@@ -55,19 +97,26 @@ class Profile(models.Model):
         qs = (Follow.objects.filter(follower_profile=self).select_related('profile'))
         return [f.profile for f in qs]                         
 
+    def get_following_page(self, page_size, cursor=None):
+        """One page of the profiles this profile follows, most recent first."""
+        return _follow_page(Follow.objects.filter(follower_profile=self), "profile", page_size, cursor)
+
     def get_num_following(self):
-        """Return the COUNT of profiles this profile follows."""
-        from .models import Follow
-        return Follow.objects.filter(follower_profile=self).count()
+        """Return the number of profiles this profile follows (stored counter)."""
+        return self.num_following
+
+    def get_num_posts(self):
+        """Return the number of posts of this profile (stored counter)."""
+        return self.num_posts
     
     def get_post_feed(self, include_self=False):
-        """Return posts from the profiles this user follows"""
+        """Return posts from the profiles this user follows, ready to render"""
         from .models import Follow, Post  
 
         followed_ids = (Follow.objects.filter(follower_profile=self).values_list('profile_id', flat=True))
         qs = Post.objects.filter(profile_id__in=followed_ids)
 
-        return (qs.select_related('profile').order_by('-published'))
+        return with_post_details(qs).order_by('-created', '-id')
     
     def is_following(self, other: "Profile") -> bool:
         from .models import Follow
@@ -75,34 +124,61 @@ class Profile(models.Model):
     
 
     
-class Post(models.Model):
+class Post(FUpdatedFieldsMixin, models.Model):
     "Encapsulate the idea of a Post for a Profile"
     
     # data attributes for the Post:
     profile = models.ForeignKey(Profile, on_delete=models.CASCADE)
     caption = models.TextField(blank=False)
     published = models.DateTimeField(auto_now=True)
+    # never changes after the insert, unlike `published`, so lists and
+    # cursors are ordered on it
+    created = models.DateTimeField(auto_now_add=True)
+    # bumped when the cached post card must be redrawn (mini_insta.fragments)
+    fragment_version = models.PositiveIntegerField(default=0)
+
+    F_UPDATED_FIELDS = ("fragment_version",)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["profile", "-created", "-id"], name="post_profile_created_idx"),
+        ]
 
     def __str__(self):
         "Return a string representation of this object"
         return f'{self.caption}'
     
+    # The helpers below use what with_post_details() prefetched when the
+    # post came from such a queryset, and query the database otherwise.
+
     def get_all_photos(self):
         """Return all Photos for this post"""
+        if hasattr(self, 'prefetched_photos'):
+            return self.prefetched_photos
         return Photo.objects.filter(post=self).order_by('-timestamp')
     
     def get_all_comments(self):
         """Return all comments for this post, newest first."""
+        if hasattr(self, 'prefetched_comments'):
+            return self.prefetched_comments
         return self.comments.select_related('profile').order_by('-timestamp')
     
     def get_likes(self):
         """Return all Like rows for this post."""
         from .models import Like
         return (Like.objects.filter(post=self).select_related('profile').order_by('-timestamp'))
+
+    def get_first_like(self):
+        """Return the most recent Like of this post (None if nobody liked it)."""
+        if hasattr(self, 'prefetched_first_like'):
+            return self.prefetched_first_like[0] if self.prefetched_first_like else None
+        return self.get_likes().first()
     
     def get_num_likes(self):
         """Return all number of Likes."""
         from .models import Like
+        if hasattr(self, 'like_count'):
+            return self.like_count
         return Like.objects.filter(post=self).count()
     
     def is_liked_by(self, profile: "Profile") -> bool:
@@ -110,7 +186,27 @@ class Post(models.Model):
         return Like.objects.filter(post=self, profile=profile).exists()
 
 
+def with_post_details(qs):
+    """Return the Post queryset qs with everything a post card shows loaded
+    up front: author, photos, comments (with authors), the latest liker and
+    the like count. Rendering any number of posts then costs the same few
+    queries."""
+    return (qs.select_related('profile')
+              .annotate(like_count=Count('likes'))
+              .prefetch_related(
+                  Prefetch('photos', queryset=Photo.objects.order_by('-timestamp'),
+                           to_attr='prefetched_photos'),
+                  Prefetch('comments', queryset=Comment.objects.select_related('profile').order_by('-timestamp'),
+                           to_attr='prefetched_comments'),
+                  Prefetch('likes', queryset=Like.objects.select_related('profile').order_by('-timestamp')[:1],
+                           to_attr='prefetched_first_like'),
+              ))
+
     
+# Shown for an uploaded photo whose renditions are not ready yet.
+PROCESSING_PLACEHOLDER_URL = "https://placehold.co/600x400?text=Processing"
+
+
 class Photo(models.Model):
     "Encapsulates the idea of a Photo for a Post"
     
@@ -119,39 +215,125 @@ class Photo(models.Model):
     image_url  = models.URLField(blank=True)
     image_file = models.ImageField(upload_to='photos/', blank=True, null=True)
     timestamp  = models.DateTimeField(auto_now=True)
+    # {"thumb" | "feed" | "full": storage path}, filled by mini_insta.images
+    renditions = models.JSONField(default=dict, blank=True)
 
-    def get_image_url(self):
+    def get_image_url(self, size=None):
+        """URL of the image. An uploaded file is only ever served through its
+        resized rendition (size "thumb", "feed" or "full"; "full" by default),
+        never as the original with its EXIF/GPS metadata, so until the
+        renditions exist this is a placeholder."""
         if self.image_url:
             return self.image_url
         if self.image_file:
-            try:
-                return self.image_file.url
-            except ValueError:
-                return ''
+            path = self.renditions.get(size or "full")
+            if path:
+                return self.image_file.storage.url(path)
+            return PROCESSING_PLACEHOLDER_URL
         return ''
 
+    def get_thumbnail_url(self):
+        return self.get_image_url("thumb")
+
+    def get_feed_url(self):
+        return self.get_image_url("feed")
+
+    def get_full_url(self):
+        return self.get_image_url("full")
+
     def __str__(self):
         src = self.get_image_url()
         return f"Photo({src})" if src else f"Photo(id={self.pk})"
     
     
+# Profile columns loaded for each row of a followers/following list.
+FOLLOW_LIST_FIELDS = ("username", "display_name", "profile_image_url")
+
+
+def _follow_page(follows, side, page_size, cursor):
+    """Keyset page of a Follow queryset, returned as the Profiles on `side`."""
+    follows = follows.select_related(side).only("created", side, *(f"{side}__{f}" for f in FOLLOW_LIST_FIELDS))
+    page, next_cursor = keyset_page(follows, page_size, cursor)
+    profiles = []
+    for follow in page:
+        profile = getattr(follow, side)
+        profile.followed_since = follow.created
+        profiles.append(profile)
+    return profiles, next_cursor
+
+
 class Follow(models.Model):
     """Showing a follower in a profile."""
 
     profile = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name="profile")
     follower_profile = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name="follower_profile")
     timestamp = models.DateTimeField(auto_now=True)
+    # never changes after the insert, unlike `timestamp`, so the follower
+    # and following lists are paged on it
+    created = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         constraints = [
             models.UniqueConstraint(fields=["profile", "follower_profile"], name="unique_follow"),
             #models.CheckConstraint(check=~Q(profile=F('follower_profile')), name="no_self_follow"),
         ]
+        indexes = [
+            models.Index(fields=["profile", "-created", "-id"], name="follow_followers_idx"),
+            models.Index(fields=["follower_profile", "-created", "-id"], name="follow_following_idx"),
+        ]
 
     def __str__(self):
         return f"{self.follower_profile} follows {self.profile}"
     
     
+class TimelineEntry(models.Model):
+    """One post in the home timeline of one profile (fan-out on write).
+
+    `created` and `author` are copies of the post's (neither changes), so a
+    timeline page is read from this table alone.
+    """
+    owner = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name="timeline_entries")
+    post = models.ForeignKey('Post', on_delete=models.CASCADE, related_name="timeline_entries")
+    author = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name="+")
+    created = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["owner", "post"], name="unique_timeline_entry"),
+        ]
+        indexes = [
+            models.Index(fields=["owner", "-created", "-post"], name="timeline_owner_idx"),
+            models.Index(fields=["owner", "author"], name="timeline_owner_author_idx"),
+        ]
+
+    def __str__(self):
+        return f"Post #{self.post_id} in the timeline of {self.owner_id}"
+
+
+class SearchDocument(models.Model):
+    """Searchable text of one Profile or Post, indexed for full-text search.
+
+    Kept in step by the receivers in mini_insta/signals.py; the full-text
+    index over it is created by migration 0015 (see mini_insta/search.py).
+    """
+    PROFILE = "profile"
+    POST = "post"
+    KINDS = [(PROFILE, "Profile"), (POST, "Post")]
+
+    kind = models.CharField(max_length=10, choices=KINDS)
+    object_id = models.PositiveBigIntegerField()
+    title = models.TextField(blank=True)
+    body = models.TextField(blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["kind", "object_id"], name="unique_search_document"),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.object_id}"
+
+
 class Comment(models.Model):
     """A response by a Profile on a Post."""
     post = models.ForeignKey('Post', on_delete=models.CASCADE, related_name='comments')
@@ -0,0 +1,55 @@
+# File: mini_insta/pagination.py
+# Author: María Díaz Garrido
+# Description: Cursor (keyset) pagination helpers for mini_insta lists that
+#              are ordered newest first by a (timestamp, id) pair. A cursor is
+#              an opaque token for the last row shown; the next page is every
+#              row strictly older than it.
+
+import base64
+import json
+from datetime import datetime
+
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(timestamp, pk):
+    """Pack the (timestamp, id) of a row into an opaque token."""
+    raw = json.dumps([timestamp.isoformat(), pk], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token):
+    """Inverse of encode_cursor(); raises InvalidCursor on anything malformed."""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        timestamp, pk = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        timestamp = datetime.fromisoformat(timestamp)
+    except (ValueError, TypeError):
+        raise InvalidCursor(token)
+    if not isinstance(pk, int) or isinstance(pk, bool):
+        raise InvalidCursor(token)
+    return timestamp, pk
+
+
+def older_than(timestamp, pk, time_field, id_field="id"):
+    """Q for the rows that come after (timestamp, pk) in newest-first order."""
+    return (Q(**{f"{time_field}__lt": timestamp})
+            | Q(**{time_field: timestamp, f"{id_field}__lt": pk}))
+
+
+def keyset_page(qs, page_size, cursor=None, time_field="created"):
+    """One newest-first page of qs, ordered by (time_field, id).
+
+    Returns (objects, next_cursor); next_cursor is None on the last page.
+    Raises InvalidCursor for a malformed cursor.
+    """
+    if cursor:
+        qs = qs.filter(older_than(*decode_cursor(cursor), time_field))
+    rows = list(qs.order_by(f"-{time_field}", "-id")[:page_size + 1])
+    page = rows[:page_size]
+    next_cursor = encode_cursor(getattr(page[-1], time_field), page[-1].pk) if len(rows) > page_size else None
+    return page, next_cursor
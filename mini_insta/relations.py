@@ -0,0 +1,77 @@
+# File: mini_insta/relations.py
+# Author: María Díaz Garrido
+# Description: What the viewing profile has liked and whom it follows, loaded
+#              in bulk once per request, so a page with N like or follow
+#              buttons costs one query per kind instead of one per button
+#              (Post.is_liked_by / Profile.is_following ask one at a time).
+#              The viewing profile itself is also looked up once per request.
+
+from .models import Follow, Like, Profile
+
+
+def current_profile(request):
+    """The logged-in user's Profile (their first one) or None, cached on the request."""
+    if not hasattr(request, "_current_profile"):
+        user = getattr(request, "user", None)
+        request._current_profile = (
+            Profile.objects.filter(user=user).order_by("pk").first()
+            if user is not None and user.is_authenticated else None
+        )
+    return request._current_profile
+
+
+class ViewerRelations:
+    """Like and follow state of one viewing profile (None when logged out)."""
+
+    def __init__(self, viewer):
+        self.viewer = viewer
+        self._following = None
+        self._liked = set()
+        self._checked_posts = set()
+
+    @property
+    def following_ids(self):
+        """Set of ids of the profiles the viewer follows."""
+        if self._following is None:
+            self._following = set()
+            if self.viewer is not None:
+                self._following = set(
+                    Follow.objects.filter(follower_profile=self.viewer).values_list("profile_id", flat=True)
+                )
+        return self._following
+
+    def liked_ids(self, post_ids):
+        """Subset of post_ids the viewer has liked, in one query for the unseen ids."""
+        missing = set(post_ids) - self._checked_posts
+        if missing and self.viewer is not None:
+            self._liked |= set(
+                Like.objects.filter(profile=self.viewer, post_id__in=missing).values_list("post_id", flat=True)
+            )
+        self._checked_posts |= missing
+        return self._liked & set(post_ids)
+
+    def likes(self, post):
+        return post.pk in self.liked_ids([post.pk])
+
+    def follows(self, profile):
+        return profile.pk in self.following_ids
+
+    def annotate_posts(self, posts):
+        """Set post.liked_by_viewer on every post; returns posts."""
+        liked = self.liked_ids([post.pk for post in posts])
+        for post in posts:
+            post.liked_by_viewer = post.pk in liked
+        return posts
+
+    def annotate_profiles(self, profiles):
+        """Set profile.followed_by_viewer on every profile; returns profiles."""
+        for profile in profiles:
+            profile.followed_by_viewer = profile.pk in self.following_ids
+        return profiles
+
+
+def viewer_relations(request):
+    """The ViewerRelations of this request, created on first use."""
+    if not hasattr(request, "_viewer_relations"):
+        request._viewer_relations = ViewerRelations(current_profile(request))
+    return request._viewer_relations
@@ -0,0 +1,122 @@
+# File: mini_insta/search.py
+# Author: María Díaz Garrido
+# Description: Full-text search over profiles and posts. Every Profile and Post
+#              has a SearchDocument row (kept in sync by signals, and rebuilt
+#              by `manage.py rebuild_search_index` after bulk writes that
+#              bypass them); on SQLite it
+#              is indexed by the FTS5 table mini_insta_searchdocument_fts, on
+#              PostgreSQL by a GIN-indexed tsvector expression (both created by
+#              migration 0015). A single ranked query returns profiles and
+#              posts together; other backends fall back to icontains.
+
+import re
+
+from django.db import connection, transaction
+from django.db.models import Q
+
+from .models import Post, Profile, SearchDocument, with_post_details
+
+
+FTS_TABLE = "mini_insta_searchdocument_fts"
+BATCH_SIZE = 1000
+
+# Must match the expression indexed by migration 0015 on PostgreSQL.
+PG_DOCUMENT = (
+    "(setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(body, '')), 'B'))"
+)
+
+
+def search_terms(text):
+    """Split user input into word tokens, dropping FTS syntax characters."""
+    return re.findall(r"\w+", text or "")[:10]
+
+
+def document_for(obj):
+    """(kind, object_id, title, body) of the SearchDocument for a Profile or Post."""
+    if isinstance(obj, Profile):
+        return SearchDocument.PROFILE, obj.pk, f"{obj.username} {obj.display_name}", obj.bio_text
+    return SearchDocument.POST, obj.pk, "", obj.caption
+
+
+def index_object(obj):
+    kind, object_id, title, body = document_for(obj)
+    SearchDocument.objects.update_or_create(kind=kind, object_id=object_id,
+                                            defaults={"title": title, "body": body})
+
+
+def unindex_object(obj):
+    kind, object_id, _, _ = document_for(obj)
+    SearchDocument.objects.filter(kind=kind, object_id=object_id).delete()
+
+
+def rebuild_index():
+    """Recreate every SearchDocument from Profile and Post. Returns how many."""
+    objects = [
+        Profile.objects.only("username", "display_name", "bio_text"),
+        Post.objects.only("caption"),
+    ]
+    count = 0
+    with transaction.atomic():
+        SearchDocument.objects.all().delete()
+        for qs in objects:
+            batch = []
+            for obj in qs.iterator(chunk_size=BATCH_SIZE):
+                kind, object_id, title, body = document_for(obj)
+                batch.append(SearchDocument(kind=kind, object_id=object_id, title=title, body=body))
+                if len(batch) == BATCH_SIZE:
+                    SearchDocument.objects.bulk_create(batch)
+                    count += len(batch)
+                    batch = []
+            SearchDocument.objects.bulk_create(batch)
+            count += len(batch)
+    return count
+
+
+def _ranked_keys(terms, offset, limit):
+    """(kind, object_id) of the matching documents, best first."""
+    table = SearchDocument._meta.db_table
+    if connection.vendor == "sqlite":
+        # every term is a quoted prefix query; a hit in the name outweighs the text
+        match = " ".join('"{}"*'.format(t.replace('"', "")) for t in terms)
+        sql = (f"SELECT d.kind, d.object_id FROM {FTS_TABLE} f JOIN {table} d ON d.id = f.rowid "
+               f"WHERE {FTS_TABLE} MATCH %s ORDER BY bm25({FTS_TABLE}, 4.0, 1.0), d.id LIMIT %s OFFSET %s")
+        params = [match, limit, offset]
+    elif connection.vendor == "postgresql":
+        query = " & ".join(f"{t}:*" for t in terms)
+        sql = (f"SELECT kind, object_id FROM {table} WHERE {PG_DOCUMENT} @@ to_tsquery('simple', %s) "
+               f"ORDER BY ts_rank({PG_DOCUMENT}, to_tsquery('simple', %s)) DESC, id LIMIT %s OFFSET %s")
+        params = [query, query, limit, offset]
+    else:
+        q = Q()
+        for term in terms:
+            q &= Q(title__icontains=term) | Q(body__icontains=term)
+        return list(SearchDocument.objects.filter(q).order_by("id")
+                                   .values_list("kind", "object_id")[offset:offset + limit])
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def search(text, offset=0, limit=20, posts=None):
+    """One ranked page of profiles and posts matching `text`.
+
+    Returns (hits, more) where hits is a list of (kind, object) pairs in rank
+    order, posts loaded from the `posts` queryset (with_post_details() of
+    every Post by default), and more tells whether another page follows.
+    """
+    terms = search_terms(text)
+    if not terms:
+        return [], False
+
+    keys = _ranked_keys(terms, offset, limit + 1)
+    more, keys = len(keys) > limit, keys[:limit]
+    ids = {kind: [pk for k, pk in keys if k == kind] for kind, _ in SearchDocument.KINDS}
+    objects = {
+        SearchDocument.PROFILE: Profile.objects.in_bulk(ids[SearchDocument.PROFILE]),
+        SearchDocument.POST: (posts if posts is not None else with_post_details(Post.objects.all()))
+                             .filter(pk__in=ids[SearchDocument.POST]).in_bulk(),
+    }
+    hits = [(kind, objects[kind][pk]) for kind, pk in keys if pk in objects[kind]]
+    return hits, more
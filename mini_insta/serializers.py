@@ -0,0 +1,17 @@
+# File: mini_insta/serializers.py
+# Author: María Díaz Garrido
+# Description: DRF serializers for the mini_insta JSON API.
+
+from rest_framework import serializers
+from .models import Profile
+
+class ProfileSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Profile
+        fields = ["id", "username", "display_name", "profile_image_url"]
+
+class SuggestionSerializer(ProfileSummarySerializer):
+    mutual_count = serializers.IntegerField(read_only=True)
+
+    class Meta(ProfileSummarySerializer.Meta):
+        fields = ProfileSummarySerializer.Meta.fields + ["mutual_count"]
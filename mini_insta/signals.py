@@ -0,0 +1,94 @@
+# File: mini_insta/signals.py
+# Author: María Díaz Garrido
+# Description: Signal receivers for the mini_insta app. Follow and Post rows
+#              update the denormalized Profile counters as they are created
+#              and deleted, including deletes that cascade from a profile, and
+#              keep the materialized home timelines, the in-memory follow
+#              graph and the search index in step (the index is derived data,
+#              so fixture loads update it too). Uploaded photos are queued
+#              for resizing. Any change to a post, photo, like, comment or
+#              profile bumps the fragment version of what it shows up in
+#              (follows and post counts are part of the header's cache key).
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import counters, fragments, graph, images, search, timeline
+from .models import Comment, Follow, Like, Photo, Post, Profile
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.follow_added(instance)
+        timeline.followed(instance)
+        transaction.on_commit(lambda: graph.follow_added(instance))
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    counters.follow_removed(instance)
+    timeline.unfollowed(instance)
+    transaction.on_commit(lambda: graph.follow_removed(instance))
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw=False, **kwargs):
+    search.index_object(instance)
+    if raw:
+        return
+    if created:
+        counters.post_added(instance)
+        timeline.fan_out(instance)
+    else:
+        fragments.bump_posts(instance.pk)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    counters.post_removed(instance)
+    search.unindex_object(instance)
+
+
+@receiver(post_save, sender=Profile)
+def profile_saved(sender, instance, created, raw=False, **kwargs):
+    search.index_object(instance)
+    if raw:
+        return
+    if not created:
+        fragments.bump_profile(instance.pk)
+
+
+@receiver(post_delete, sender=Profile)
+def profile_deleted(sender, instance, **kwargs):
+    search.unindex_object(instance)
+
+
+@receiver(post_save, sender=Photo)
+def photo_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    if instance.image_file and not instance.renditions:
+        images.schedule_renditions(instance)
+    fragments.bump_posts(instance.post_id)
+
+
+@receiver(post_delete, sender=Photo)
+def photo_deleted(sender, instance, **kwargs):
+    if instance.image_file:
+        images.delete_renditions(instance)
+    fragments.bump_posts(instance.post_id)
+
+
+@receiver(post_save, sender=Like)
+@receiver(post_save, sender=Comment)
+def post_reaction_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        fragments.bump_posts(instance.post_id)
+
+
+@receiver(post_delete, sender=Like)
+@receiver(post_delete, sender=Comment)
+def post_reaction_deleted(sender, instance, **kwargs):
+    fragments.bump_posts(instance.post_id)
@@ -1,3 +1,307 @@
-from django.test import TestCase
+from io import StringIO
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core import serializers
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from .counters import recount_profiles
+from .models import Comment, Follow, Like, Post, Profile, SearchDocument, TimelineEntry
+from .pagination import keyset_page
+from .search import search
+from .timeline import timeline_page
+
+
+def make_profile(username):
+    user = User.objects.create(username=username)
+    return Profile.objects.create(user=user, username=username)
+
+
+def feed_ids(profile, page_size=50):
+    posts, _ = timeline_page(profile, page_size)
+    return [post.pk for post in posts]
+
+
+def all_pages(load_page, page_size):
+    """Follow the cursors of load_page(page_size, cursor) to the end; every pk seen, in order."""
+    seen, cursor = [], None
+    while True:
+        page, cursor = load_page(page_size, cursor)
+        seen += [obj.pk for obj in page]
+        if cursor is None:
+            return seen
+
+
+class TimelineTests(TestCase):
+
+    def setUp(self):
+        self.author = make_profile("author")
+        self.reader = make_profile("reader")
+        self.stranger = make_profile("stranger")
+
+    def test_new_posts_are_fanned_out_to_followers_only(self):
+        Follow.objects.create(profile=self.author, follower_profile=self.reader)
+
+        post = Post.objects.create(profile=self.author, caption="hello")
+
+        self.assertEqual(feed_ids(self.reader), [post.pk])
+        self.assertEqual(feed_ids(self.stranger), [])
+        self.assertFalse(TimelineEntry.objects.filter(owner=self.stranger).exists())
+
+    def test_follow_backfills_and_unfollow_removes(self):
+        older = Post.objects.create(profile=self.author, caption="older")
+        newer = Post.objects.create(profile=self.author, caption="newer")
+
+        follow = Follow.objects.create(profile=self.author, follower_profile=self.reader)
+        self.assertEqual(feed_ids(self.reader), [newer.pk, older.pk])
+
+        follow.delete()
+        self.assertEqual(feed_ids(self.reader), [])
+        self.assertFalse(TimelineEntry.objects.filter(owner=self.reader).exists())
+
+    def test_deleted_post_leaves_the_timeline(self):
+        Follow.objects.create(profile=self.author, follower_profile=self.reader)
+        post = Post.objects.create(profile=self.author, caption="oops")
+
+        post.delete()
+
+        self.assertEqual(feed_ids(self.reader), [])
+
+
+@override_settings(MINI_INSTA_FANOUT_LIMIT=2)
+class PullModeTests(TestCase):
+    """An author over the fan-out limit is pulled; back under half of it, fanned out again."""
+
+    def setUp(self):
+        self.author = make_profile("author")
+        self.readers = [make_profile(f"reader{i}") for i in range(3)]
+
+    def follow(self, reader):
+        return Follow.objects.create(profile=self.author, follower_profile=reader)
+
+    def pulled(self):
+        self.author.refresh_from_db()
+        return self.author.timeline_pulled
+
+    def test_going_over_the_limit_pulls_new_posts(self):
+        first = Post.objects.create(profile=self.author, caption="before")
+        for reader in self.readers:
+            self.follow(reader)
+        self.assertTrue(self.pulled())
+
+        later = Post.objects.create(profile=self.author, caption="while pulled")
+
+        for reader in self.readers:
+            self.assertEqual(feed_ids(reader), [later.pk, first.pk])
+
+    def test_dropping_back_under_the_limit_backfills_every_follower(self):
+        for reader in self.readers:
+            self.follow(reader)
+        late_reader = make_profile("late")
+        self.follow(late_reader)
+        post = Post.objects.create(profile=self.author, caption="while pulled")
+
+        # 4 -> 3 -> 2 followers: still pulled (hysteresis), and still shown
+        Follow.objects.get(follower_profile=self.readers[0]).delete()
+        Follow.objects.get(follower_profile=self.readers[1]).delete()
+        self.assertTrue(self.pulled())
+        self.assertEqual(feed_ids(self.readers[2]), [post.pk])
+
+        # 1 follower is half the limit: fanned out again, nothing lost
+        Follow.objects.get(follower_profile=self.readers[2]).delete()
+        self.assertFalse(self.pulled())
+        self.assertEqual(feed_ids(late_reader), [post.pk])
+        self.assertEqual(feed_ids(self.readers[2]), [])
+
+        newer = Post.objects.create(profile=self.author, caption="fanned out")
+        self.assertEqual(feed_ids(late_reader), [newer.pk, post.pk])
+
+    def test_stale_profile_save_keeps_the_mode(self):
+        stale = Profile.objects.get(pk=self.author.pk)
+        for reader in self.readers:
+            self.follow(reader)
+        stale.bio_text = "edited"
+        stale.save()
+        self.assertTrue(self.pulled())
+
+
+class SearchIndexTests(TestCase):
+
+    def setUp(self):
+        self.author = make_profile("author")
+
+    def hits(self, text):
+        return [(kind, obj.pk) for kind, obj in search(text)[0]]
+
+    def test_rebuild_indexes_bulk_writes(self):
+        post = Post.objects.bulk_create([Post(profile=self.author, caption="bulk sunrise")])[0]
+        Profile.objects.filter(pk=self.author.pk).update(bio_text="mountain guide")
+        self.assertEqual(self.hits("sunrise"), [])
+
+        call_command("rebuild_search_index", stdout=StringIO())
+
+        self.assertEqual(self.hits("sunrise"), [(SearchDocument.POST, post.pk)])
+        self.assertEqual(self.hits("mountain"), [(SearchDocument.PROFILE, self.author.pk)])
+        self.assertEqual(SearchDocument.objects.count(), 2)
+
+    def test_fixture_loads_are_indexed(self):
+        post = Post.objects.create(profile=self.author, caption="fixture sunset")
+        data = serializers.serialize("json", [post])
+        Post.objects.all().delete()
+        self.assertEqual(self.hits("sunset"), [])
+
+        for obj in serializers.deserialize("json", data):
+            obj.save()  # what loaddata does: a raw save
+
+        self.assertEqual(self.hits("sunset"), [(SearchDocument.POST, post.pk)])
+
+
+class FollowListTests(TestCase):
+
+    def test_resaving_a_follow_does_not_move_it_between_pages(self):
+        star = make_profile("star")
+        fans = [make_profile(f"fan{i}") for i in range(5)]
+        for fan in fans:
+            Follow.objects.create(profile=star, follower_profile=fan)
+
+        page, cursor = star.get_followers_page(2)
+        seen = [p.pk for p in page]
+        Follow.objects.get(follower_profile=fans[0]).save()  # bumps the auto_now timestamp
+        while cursor:
+            page, cursor = star.get_followers_page(2, cursor)
+            seen += [p.pk for p in page]
+
+        self.assertEqual(seen, [fan.pk for fan in reversed(fans)])
+
+
+class CounterTests(TestCase):
+
+    def setUp(self):
+        self.alice = make_profile("alice")
+        self.bob = make_profile("bob")
+
+    def counts(self, profile):
+        profile.refresh_from_db()
+        return profile.num_followers, profile.num_following, profile.num_posts
+
+    def test_follow_and_unfollow(self):
+        follow = Follow.objects.create(profile=self.alice, follower_profile=self.bob)
+        self.assertEqual(self.counts(self.alice), (1, 0, 0))
+        self.assertEqual(self.counts(self.bob), (0, 1, 0))
+
+        follow.delete()
+        self.assertEqual(self.counts(self.alice), (0, 0, 0))
+        self.assertEqual(self.counts(self.bob), (0, 0, 0))
+
+    def test_post_create_and_delete(self):
+        posts = [Post.objects.create(profile=self.alice, caption=f"post {i}") for i in range(3)]
+        self.assertEqual(self.counts(self.alice), (0, 0, 3))
+
+        posts[0].delete()
+        self.assertEqual(self.counts(self.alice), (0, 0, 2))
+
+    def test_cascaded_delete_updates_the_other_side(self):
+        Follow.objects.create(profile=self.alice, follower_profile=self.bob)
+
+        self.bob.delete()
+
+        self.assertEqual(self.counts(self.alice), (0, 0, 0))
+
+    def test_stale_profile_save_keeps_the_counters(self):
+        stale = Profile.objects.get(pk=self.alice.pk)
+        Follow.objects.create(profile=self.alice, follower_profile=self.bob)
+        Post.objects.create(profile=self.alice, caption="new")
+
+        stale.bio_text = "edited"
+        stale.save()
+
+        self.assertEqual(self.counts(self.alice), (1, 0, 1))
+        self.assertEqual(self.alice.bio_text, "edited")
+        self.assertEqual(recount_profiles(), 0)
+
+
+class CursorPagingTests(TestCase):
+
+    def setUp(self):
+        self.author = make_profile("author")
+        self.posts = [Post.objects.create(profile=self.author, caption=f"post {i}") for i in range(7)]
+
+    def test_profile_pages_cover_every_post_once_despite_equal_times(self):
+        # all posts share one creation time: the id alone has to order them
+        Post.objects.update(created=self.posts[0].created)
+
+        seen = all_pages(lambda size, cursor: keyset_page(self.author.get_all_posts(), size, cursor), 3)
+
+        self.assertEqual(seen, [post.pk for post in reversed(self.posts)])
+
+    def test_editing_a_post_mid_scroll_does_not_move_it(self):
+        page, cursor = keyset_page(self.author.get_all_posts(), 3)
+        seen = [post.pk for post in page]
+        self.posts[0].caption = "edited"   # the oldest, still to come
+        self.posts[0].save()
+        while cursor:
+            page, cursor = keyset_page(self.author.get_all_posts(), 3, cursor)
+            seen += [post.pk for post in page]
+
+        self.assertEqual(seen, [post.pk for post in reversed(self.posts)])
+
+    @override_settings(MINI_INSTA_FANOUT_LIMIT=1)
+    def test_timeline_pages_merge_pulled_and_fanned_out_authors(self):
+        reader, other = make_profile("reader"), make_profile("other")
+        fanned = make_profile("fanned")
+        Follow.objects.create(profile=self.author, follower_profile=reader)
+        Follow.objects.create(profile=self.author, follower_profile=other)   # author is pulled now
+        Follow.objects.create(profile=fanned, follower_profile=reader)
+        mixed = [Post.objects.create(profile=who, caption="x") for who in [fanned, self.author] * 4]
+
+        seen = all_pages(lambda size, cursor: timeline_page(reader, size, cursor), 3)
+
+        expected = Post.objects.filter(pk__in=[p.pk for p in self.posts + mixed]).order_by("-created", "-id")
+        self.assertEqual(seen, [post.pk for post in expected])
+
+
+class FeedCardTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.author = make_profile("author")
+        self.reader = make_profile("reader")
+        self.fan = make_profile("fan")
+        Follow.objects.create(profile=self.author, follower_profile=self.reader)
+        self.post = Post.objects.create(profile=self.author, caption="sunset")
+        self.client.force_login(self.reader.user)
+
+    def feed(self):
+        response = self.client.get(reverse("mini_insta:profile_feed"))
+        self.assertEqual(response.status_code, 200)
+        return response.content.decode()
+
+    def test_like_redraws_the_cached_card(self):
+        self.assertIn("Be the first to like this.", self.feed())
+
+        Like.objects.create(post=self.post, profile=self.fan)
+
+        html = self.feed()
+        self.assertIn("@fan", html)
+        self.assertNotIn("Be the first to like this.", html)
+
+    def test_comment_redraws_the_cached_card(self):
+        self.assertIn("No comments yet.", self.feed())
+
+        Comment.objects.create(post=self.post, profile=self.fan, text="lovely colours")
+
+        html = self.feed()
+        self.assertIn("lovely colours", html)
+        self.assertNotIn("No comments yet.", html)
+
+    def test_like_button_follows_the_viewer_not_the_cache(self):
+        self.assertIn(reverse("mini_insta:post_like", kwargs={"pk": self.post.pk}), self.feed())
+
+        Like.objects.create(post=self.post, profile=self.reader)
+
+        self.assertIn(reverse("mini_insta:post_delete_like", kwargs={"pk": self.post.pk}), self.feed())
+        self.client.force_login(self.fan.user)
+        Follow.objects.create(profile=self.author, follower_profile=self.fan)
+        self.assertIn(reverse("mini_insta:post_like", kwargs={"pk": self.post.pk}), self.feed())
@@ -0,0 +1,148 @@
+# File: mini_insta/timeline.py
+# Author: María Díaz Garrido
+# Description: Materialized home timelines. A new post is copied into the
+#              TimelineEntry rows of every follower of its author (fan-out on
+#              write); following backfills the followed profile's recent posts
+#              and unfollowing removes them. An author who goes over
+#              MINI_INSTA_FANOUT_LIMIT followers is switched to pull mode
+#              (Profile.timeline_pulled): their posts are no longer fanned out
+#              but read from Post when a timeline is read and merged in, so
+#              one post never costs a huge write. They switch back only once
+#              down to half the limit, and then every follower's timeline is
+#              backfilled with what was missed while pulled.
+
+from heapq import merge
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import Follow, Post, Profile, TimelineEntry, with_post_details
+from .pagination import decode_cursor, encode_cursor, older_than
+
+
+BATCH_SIZE = 1000
+BACKFILL_POSTS = 100
+
+
+def fanout_limit():
+    return getattr(settings, "MINI_INSTA_FANOUT_LIMIT", 1000)
+
+
+def is_pulled(profile_id):
+    """True if posts by the profile are read at request time instead of fanned out."""
+    return Profile.objects.filter(pk=profile_id, timeline_pulled=True).exists()
+
+
+def _entry(owner_id, post):
+    return TimelineEntry(owner_id=owner_id, post_id=post.pk, author_id=post.profile_id,
+                         created=post.created)
+
+
+def fan_out(post):
+    """Add a new post to the timelines of its author's followers."""
+    if is_pulled(post.profile_id):
+        return
+    followers = (Follow.objects.filter(profile_id=post.profile_id)
+                               .values_list("follower_profile_id", flat=True)
+                               .iterator(chunk_size=BATCH_SIZE))
+    TimelineEntry.objects.bulk_create(
+        (_entry(owner_id, post) for owner_id in followers),
+        batch_size=BATCH_SIZE, ignore_conflicts=True,
+    )
+
+
+def backfill(follow, limit=BACKFILL_POSTS):
+    """Copy the latest posts of a newly followed profile into the follower's timeline."""
+    if is_pulled(follow.profile_id):
+        return
+    posts = Post.objects.filter(profile_id=follow.profile_id).order_by("-created", "-id")[:limit]
+    TimelineEntry.objects.bulk_create(
+        [_entry(follow.follower_profile_id, post) for post in posts],
+        batch_size=BATCH_SIZE, ignore_conflicts=True,
+    )
+
+
+def backfill_followers(profile_id, limit=BACKFILL_POSTS):
+    """Copy the latest posts of a profile into the timelines of all its followers."""
+    posts = list(Post.objects.filter(profile_id=profile_id).order_by("-created", "-id")[:limit])
+    followers = (Follow.objects.filter(profile_id=profile_id)
+                               .values_list("follower_profile_id", flat=True)
+                               .iterator(chunk_size=BATCH_SIZE))
+    TimelineEntry.objects.bulk_create(
+        (_entry(owner_id, post) for owner_id in followers for post in posts),
+        batch_size=BATCH_SIZE, ignore_conflicts=True,
+    )
+
+
+def followed(follow):
+    """After a new follow (and its counter update): pull the followed profile
+    from now on if it just went over the fan-out limit, else backfill."""
+    Profile.objects.filter(
+        pk=follow.profile_id, timeline_pulled=False, num_followers__gt=fanout_limit(),
+    ).update(timeline_pulled=True)
+    backfill(follow)
+
+
+def unfollowed(follow):
+    """After an unfollow: drop the author's posts from the follower's timeline,
+    and fan the author out again once down to half the limit.
+
+    While pulled, the author's new posts and new followers were never
+    written to TimelineEntry, so every follower is backfilled on the way
+    back. The gap between the two thresholds keeps a profile hovering
+    around the limit from switching on every follow and unfollow.
+    """
+    TimelineEntry.objects.filter(owner_id=follow.follower_profile_id, author_id=follow.profile_id).delete()
+    switched = Profile.objects.filter(
+        pk=follow.profile_id, timeline_pulled=True, num_followers__lte=fanout_limit() // 2,
+    ).update(timeline_pulled=False)
+    if switched:
+        backfill_followers(follow.profile_id)
+
+
+def reset_pull_modes():
+    """Set every profile's timeline_pulled from its follower count and the current limit."""
+    limit = fanout_limit()
+    Profile.objects.filter(num_followers__gt=limit).update(timeline_pulled=True)
+    Profile.objects.filter(num_followers__lte=limit).update(timeline_pulled=False)
+
+
+def rebuild_timeline(profile, limit=BACKFILL_POSTS):
+    """Recreate one profile's timeline from the profiles it follows."""
+    with transaction.atomic():
+        TimelineEntry.objects.filter(owner=profile).delete()
+        for follow in Follow.objects.filter(follower_profile=profile):
+            backfill(follow, limit)
+
+
+def timeline_page(profile, page_size, cursor=None, posts=None):
+    """One page of `profile`'s home timeline, newest first.
+
+    Returns (posts, next_cursor); next_cursor is None on the last page.
+    The posts are loaded from the `posts` queryset, with_post_details() of
+    every Post by default. Raises InvalidCursor for a malformed cursor.
+    """
+    pulled_ids = list(
+        Follow.objects.filter(follower_profile=profile, profile__timeline_pulled=True)
+                      .values_list("profile_id", flat=True)
+    )
+    entries = TimelineEntry.objects.filter(owner=profile).exclude(author_id__in=pulled_ids)
+    pulled = Post.objects.filter(profile_id__in=pulled_ids)
+    if cursor:
+        timestamp, pk = decode_cursor(cursor)
+        entries = entries.filter(older_than(timestamp, pk, "created", "post_id"))
+        pulled = pulled.filter(older_than(timestamp, pk, "created"))
+
+    # both sides are already newest first; merge them and keep one extra
+    # key to know whether there is a next page
+    keys = list(entries.order_by("-created", "-post_id").values_list("created", "post_id")[:page_size + 1])
+    if pulled_ids:
+        pulled_keys = pulled.order_by("-created", "-id").values_list("created", "id")[:page_size + 1]
+        keys = list(merge(keys, pulled_keys, reverse=True))[:page_size + 1]
+
+    page, more = keys[:page_size], len(keys) > page_size
+    if posts is None:
+        posts = with_post_details(Post.objects.all())
+    found = posts.filter(pk__in=[pk for _, pk in page]).in_bulk()
+    next_cursor = encode_cursor(*page[-1]) if more else None
+    return [found[pk] for _, pk in page if pk in found], next_cursor
@@ -30,6 +30,8 @@ urlpatterns = [
     path("profile/<int:pk>/delete_follow", FollowDeleteView.as_view(), name="profile_delete_follow"),
     path("post/<int:pk>/like", LikeCreateView.as_view(), name="post_like"),
     path("post/<int:pk>/delete_like", LikeDeleteView.as_view(), name="post_delete_like"),
+    path("api/profile/<int:pk>/suggestions", SuggestedProfilesAPIView.as_view(), name="api_suggestions"),
+    path("api/profile/<int:pk>/relationship/<int:other_pk>", RelationshipAPIView.as_view(), name="api_relationship"),
     ##authorization-related URL
     path('login/', auth_views.LoginView.as_view(template_name='mini_insta/login.html'), name='login'),
     path('logout/', auth_views.LogoutView.as_view(next_page='mini_insta:show_all_profiles'), name='logout'),
@@ -7,11 +7,19 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
 from django.db.models import Q
+from django.db import transaction
+from django.utils.decorators import method_decorator
 from django.contrib.auth import login
 from .forms import CreatePostForm, UpdateProfileForm, CreateProfileForm
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth.forms import UserCreationForm
-from .mixins import AuthProfileMixin, CurrentUserProfileObjectMixin
+from .mixins import AuthProfileMixin, CurrentUserProfileObjectMixin, FragmentCacheMixin, PostPagesMixin, ViewerRelationsMixin
+from .pagination import InvalidCursor, keyset_page
+from . import fragments
+from .graph import relationship, suggested_profiles
+from .search import search
+from .timeline import timeline_page
+from django.http import Http404
 
 
 from .models import Profile, Post, Photo, Follow, Like
@@ -41,13 +49,31 @@ class ProfileListView(ListView):
  
         return super().dispatch(request, *args, **kwargs)
     
-class ProfileDetailView(DetailView):
-    '''Defining the individual profiles'''
+class ProfileDetailView(ViewerRelationsMixin, FragmentCacheMixin, PostPagesMixin, DetailView):
+    '''Defining the individual profiles, with their posts a page at a time'''
     model = Profile
     template_name = "mini_insta/show_profile.html"
+    fragment_template_name = "mini_insta/profile_posts.html"
     context_object_name = "profile"
+    card_fragments = ("profile_post",)
+
+    def get_context_data(self, **kwargs):
+        try:
+            posts, self.next_cursor = keyset_page(fragments.card_keys(self.object.get_all_posts()),
+                                                  self.page_size, self.request.GET.get("cursor"))
+        except InvalidCursor:
+            raise Http404("Invalid cursor.")
+        posts = self.relations.annotate_posts(self.cached_cards(posts))
+        self.relations.annotate_profiles([self.object])
+        viewer = self.relations.viewer
+        if viewer is None:
+            return super().get_context_data(posts=posts, **kwargs)
+        if viewer.pk == self.object.pk:
+            suggestions = self.relations.annotate_profiles(suggested_profiles(viewer))
+            return super().get_context_data(posts=posts, suggestions=suggestions, **kwargs)
+        return super().get_context_data(posts=posts, relationship=relationship(viewer, self.object), **kwargs)
     
-class PostDetailView(DetailView):
+class PostDetailView(ViewerRelationsMixin, DetailView):
     '''A view to handle the creation of a new post
     1) Display the HTML for to user (GET)
     2) Process the form submission and store the new Post object (POST)'''
@@ -56,13 +82,8 @@ class PostDetailView(DetailView):
 
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
-        me = getattr(self.request.user, "profiles", None)
-        me = me.first() if me else None
-        post = self.object
-        ctx["current_profile"] = me
-        ctx["liked_by_me"] = (
-            bool(me) and post.likes.filter(profile=me).exists()
-        )
+        ctx["current_profile"] = self.relations.viewer
+        ctx["liked_by_me"] = self.relations.likes(self.object)
         return ctx
     
 class CreatePostView(AuthProfileMixin, CreateView):
@@ -76,6 +97,7 @@ class CreatePostView(AuthProfileMixin, CreateView):
         return ctx
 
 
+    @transaction.atomic
     def form_valid(self, form):
         profile = self.get_current_profile()
 
@@ -106,6 +128,7 @@ class UpdateProfileView(CurrentUserProfileObjectMixin, UpdateView):
         return reverse('login')
     
 
+@method_decorator(transaction.atomic, name="post")
 class DeletePostView(AuthProfileMixin, DeleteView):
     model = Post
     template_name = "mini_insta/delete_post_form.html"
@@ -128,26 +151,55 @@ class UpdatePostView(AuthProfileMixin, UpdateView):
         return reverse("mini_insta:show_post", kwargs={"pk": self.object.pk})
     
 
-class ShowFollowersDetailView(DetailView):
+class ShowFollowersDetailView(ViewerRelationsMixin, PostPagesMixin, DetailView):
+    """Followers of a profile, newest first, a page at a time (?cursor=)"""
     model = Profile
     template_name = 'mini_insta/show_followers.html'
+    fragment_template_name = 'mini_insta/follower_rows.html'
     context_object_name = 'profile' 
+    page_size = 50
+
+    def get_context_data(self, **kwargs):
+        try:
+            followers, self.next_cursor = self.object.get_followers_page(self.page_size, self.request.GET.get("cursor"))
+        except InvalidCursor:
+            raise Http404("Invalid cursor.")
+        self.relations.annotate_profiles(followers)
+        return super().get_context_data(followers=followers, **kwargs)
     
-class ShowFollowingDetailView(DetailView):
+class ShowFollowingDetailView(ViewerRelationsMixin, PostPagesMixin, DetailView):
+    """Profiles a profile follows, newest first, a page at a time (?cursor=)"""
     model = Profile
     template_name = 'mini_insta/show_following.html'
+    fragment_template_name = 'mini_insta/following_rows.html'
     context_object_name = 'profile'
+    page_size = 50
+
+    def get_context_data(self, **kwargs):
+        try:
+            following, self.next_cursor = self.object.get_following_page(self.page_size, self.request.GET.get("cursor"))
+        except InvalidCursor:
+            raise Http404("Invalid cursor.")
+        self.relations.annotate_profiles(following)
+        return super().get_context_data(following=following, **kwargs)
     
 
-class PostFeedListView(AuthProfileMixin, ListView):
-    """Feed for a single Profile"""
+class PostFeedListView(AuthProfileMixin, ViewerRelationsMixin, FragmentCacheMixin, PostPagesMixin, ListView):
+    """Feed for a single Profile, read page by page from its materialized
+    timeline (?cursor= continues after the last post shown)"""
     template_name = 'mini_insta/show_feed.html'
+    fragment_template_name = 'mini_insta/feed_posts.html'
     context_object_name = 'posts'
+    card_fragments = ("feed_post_head", "feed_post_body")
 
     def get_queryset(self):
-        profile = self.get_current_profile()
-        # Use your existing accessor that builds the feed:
-        return profile.get_post_feed()
+        self.profile = self.get_current_profile()
+        try:
+            posts, self.next_cursor = timeline_page(self.profile, self.page_size, self.request.GET.get("cursor"),
+                                                    posts=fragments.card_keys(Post.objects.all()))
+        except InvalidCursor:
+            raise Http404("Invalid cursor.")
+        return self.relations.annotate_posts(self.cached_cards(posts))
 
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
@@ -155,10 +207,14 @@ class PostFeedListView(AuthProfileMixin, ListView):
         return ctx
     
 
-class SearchView(AuthProfileMixin, ListView):
-    """Search Profiles and Posts on behalf of a given Profile"""
+class SearchView(AuthProfileMixin, ViewerRelationsMixin, FragmentCacheMixin, PostPagesMixin, ListView):
+    """Search Profiles and Posts on behalf of a given Profile, through the
+    full-text index: one ranked list, a page at a time (?cursor= is the
+    offset of the next page)"""
     template_name = 'mini_insta/search_results.html'
-    context_object_name = 'posts' 
+    fragment_template_name = 'mini_insta/search_hits.html'
+    context_object_name = 'hits'
+    card_fragments = ("search_post",)
 
     def dispatch(self, request, *args, **kwargs):
         self.profile = self.get_current_profile()
@@ -170,27 +226,23 @@ class SearchView(AuthProfileMixin, ListView):
         return super().dispatch(request, *args, **kwargs)
 
     def get_queryset(self):
-        if not self.query:
-            return Post.objects.none()
-        return (Post.objects
-                .filter(caption__icontains=self.query)
-                .select_related("profile")
-                .order_by("-published"))
+        cursor = self.request.GET.get("cursor") or "0"
+        if not cursor.isdigit():
+            raise Http404("Invalid cursor.")
+        offset = int(cursor)
+        hits, more = search(self.query, offset, self.page_size, posts=fragments.card_keys(Post.objects.all()))
+        self.next_cursor = str(offset + self.page_size) if more else None
+        cards = {post.pk: post for post in self.cached_cards([hit for kind, hit in hits if kind == "post"])}
+        hits = [(kind, cards[hit.pk] if kind == "post" else hit) for kind, hit in hits]
+        self.relations.annotate_posts(list(cards.values()))
+        self.relations.annotate_profiles([hit for kind, hit in hits if kind == "profile"])
+        return hits
 
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
-        profiles = Profile.objects.none()
-        if self.query:
-            profiles = Profile.objects.filter(
-                Q(username__icontains=self.query) |
-                Q(display_name__icontains=self.query) |
-                Q(bio_text__icontains=self.query)
-            ).order_by("display_name", "username")
-
         ctx.update({
             "profile": self.profile,
             "query": self.query,
-            "profiles": profiles,
         })
         return ctx
     
@@ -219,6 +271,7 @@ class CreateProfileView(CreateView):
     
     
 class FollowCreateView(AuthProfileMixin, CreateView):
+    @transaction.atomic
     def post(self, request, pk):
         me = self.get_current_profile()
         other = get_object_or_404(Profile, pk=pk)
@@ -231,6 +284,7 @@ class FollowCreateView(AuthProfileMixin, CreateView):
 
 
 class FollowDeleteView(AuthProfileMixin, DeleteView):
+    @transaction.atomic
     def post(self, request, pk):
         me = self.get_current_profile()
         other = get_object_or_404(Profile, pk=pk)
@@ -261,4 +315,40 @@ class LikeDeleteView(AuthProfileMixin, DeleteView):
         return redirect(request.POST.get("next") or post.get_absolute_url())
 
     def get(self, request, pk):
-        return self.post(request, pk)
\ No newline at end of file
+        return self.post(request, pk)
+
+
+###############################################################################
+# REST API
+
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from .serializers import ProfileSummarySerializer, SuggestionSerializer
+
+
+class SuggestedProfilesAPIView(APIView):
+    """
+    GET -> profiles followed by the profiles <pk> follows, most shared first
+           (?limit=, default 10, at most 50)
+    """
+    def get(self, request, pk, *args, **kwargs):
+        profile = get_object_or_404(Profile, pk=pk)
+        limit = request.GET.get("limit", "10")
+        if not limit.isdigit():
+            return Response({"detail": "limit must be a number."}, status=status.HTTP_400_BAD_REQUEST)
+        suggestions = suggested_profiles(profile, min(int(limit), 50))
+        return Response(SuggestionSerializer(suggestions, many=True).data)
+
+
+class RelationshipAPIView(APIView):
+    """
+    GET -> how profile <pk> relates to profile <other_pk>: mutual followers
+           (count and a sample), who follows whom and the follow distance
+    """
+    def get(self, request, pk, other_pk, *args, **kwargs):
+        profile = get_object_or_404(Profile, pk=pk)
+        other = get_object_or_404(Profile, pk=other_pk)
+        data = relationship(profile, other)
+        data["mutual_sample"] = ProfileSummarySerializer(data["mutual_sample"], many=True).data
+        return Response(data)
@@ -0,0 +1,51 @@
+# File: voter_analytics/caching.py
+# Author: María Díaz Garrido
+# Description: Data version of the voter tables. Anything cached from Voter
+#              puts the version token in its key, so bumping the version after
+#              an import invalidates all of it at once. The version lives in
+#              the DataVersion table, so every process sees the same token
+#              whatever cache backend is configured.
+
+import hashlib
+import uuid
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import DataVersion
+
+
+DATA_VERSION_NAME = "voters"
+
+
+def _new_version():
+    return {"token": uuid.uuid4().hex[:12], "updated": timezone.now()}
+
+
+def data_version():
+    """Return {"token": str, "updated": datetime} for the current voter data.
+
+    One primary-key-sized query. The first call on an empty table starts a
+    fresh version.
+    """
+    version = DataVersion.objects.filter(name=DATA_VERSION_NAME).values("token", "updated").first()
+    if version is not None:
+        return version
+    try:
+        with transaction.atomic():
+            DataVersion.objects.create(name=DATA_VERSION_NAME, **_new_version())
+    except IntegrityError:
+        pass  # another process created it first
+    return DataVersion.objects.filter(name=DATA_VERSION_NAME).values("token", "updated").get()
+
+
+def bump_data_version():
+    version = _new_version()
+    DataVersion.objects.update_or_create(name=DATA_VERSION_NAME, defaults=version)
+    return version
+
+
+def versioned_key(prefix, *parts):
+    """Cache key for `prefix` that changes whenever the data version does."""
+    digest = hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()
+    return f"voter_analytics:{prefix}:{data_version()['token']}:{digest}"
@@ -0,0 +1,59 @@
+# File: voter_analytics/choices.py
+# Author: María Díaz Garrido
+# Description: Choice lists (parties, birth years, voter scores) for the voter
+#              filter dropdowns. They only change when voters are imported, so
+#              they are kept in the process and in the Django cache, keyed on
+#              the data version that the importer bumps.
+
+import threading
+
+from django.core.cache import cache
+
+from .caching import data_version, versioned_key
+from .models import VoterSummary
+
+
+_local = {"token": None, "choices": None}
+_lock = threading.Lock()
+
+
+def _load_choices():
+    """Read the distinct filter values from the (small) summary table."""
+    summary = VoterSummary.objects.all()
+    return {
+        "party": list(
+            summary.exclude(party__isnull=True)
+                   .exclude(party__exact="")
+                   .values_list("party", flat=True)
+                   .distinct()
+                   .order_by("party")
+        ),
+        "year": list(
+            summary.exclude(birth_year__isnull=True)
+                   .values_list("birth_year", flat=True)
+                   .distinct()
+                   .order_by("birth_year")
+        ),
+        "score": list(
+            summary.values_list("voter_score", flat=True)
+                   .distinct()
+                   .order_by("voter_score")
+        ),
+    }
+
+
+def filter_choices():
+    """Return {"party": [...], "year": [...], "score": [...]}.
+
+    Served from process memory while the data version is unchanged, then
+    from the shared cache, and only computed from the database when both
+    miss.
+    """
+    token = data_version()["token"]
+    if _local["token"] == token:
+        return _local["choices"]
+    with _lock:
+        if _local["token"] != token:
+            _local["choices"] = cache.get_or_set(versioned_key("choices"), _load_choices, timeout=None)
+            _local["token"] = token
+    return _local["choices"]
@@ -0,0 +1,136 @@
+# File: voter_analytics/export.py
+# Author: María Díaz Garrido
+# Description: Streaming exports of a filtered Voter queryset. Rows are read
+#              with values_list().iterator() in chunks and written out as they
+#              arrive, so memory stays flat even when exporting every voter.
+#              CSV needs nothing extra; Parquet and Arrow need pyarrow.
+
+import csv
+from itertools import islice
+
+
+EXPORT_FIELDS = (
+    "voter_id",
+    "last_name",
+    "first_name",
+    "address_street_number",
+    "address_street_name",
+    "address_apartment_number",
+    "address_zip_code",
+    "date_birth",
+    "date_registration",
+    "party",
+    "precinct_number",
+    "v20state",
+    "v21town",
+    "v21primary",
+    "v22general",
+    "v23town",
+    "voter_score",
+)
+CHUNK_SIZE = 5000
+
+DATE_FIELDS = ("date_birth", "date_registration")
+INT_FIELDS = ("v20state", "v21town", "v21primary", "v22general", "v23town", "voter_score")
+
+
+class Echo:
+    """File-like object whose write() just returns the value, for csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def _rows(qs):
+    # keep the caller's ordering (e.g. search rank); otherwise export by id
+    if not qs.query.order_by:
+        qs = qs.order_by("id")
+    return qs.values_list(*EXPORT_FIELDS).iterator(chunk_size=CHUNK_SIZE)
+
+
+def iter_csv(qs):
+    """Yield the CSV export of qs line by line, header first."""
+    writer = csv.writer(Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in _rows(qs):
+        yield writer.writerow(row)
+
+
+class _ChunkSink:
+    """Write-only file object that hands back whatever was written so far."""
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        self.buffer += data
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = bytes(self.buffer)
+        self.buffer.clear()
+        return data
+
+
+def _arrow_schema(pa):
+    def arrow_type(field):
+        if field in DATE_FIELDS:
+            return pa.date32()
+        if field in INT_FIELDS:
+            return pa.int32()
+        return pa.string()
+    return pa.schema([(field, arrow_type(field)) for field in EXPORT_FIELDS])
+
+
+def _iter_record_batches(qs, pa, schema):
+    rows = _rows(qs)
+    while True:
+        chunk = list(islice(rows, CHUNK_SIZE))
+        if not chunk:
+            return
+        columns = list(zip(*chunk))
+        yield pa.record_batch(
+            [pa.array(column, type=schema.field(i).type) for i, column in enumerate(columns)],
+            schema=schema,
+        )
+
+
+def iter_columnar(qs, fmt):
+    """Yield qs as a Parquet file or an Arrow IPC stream, one chunk at a time.
+
+    Each chunk of rows becomes a Parquet row group / Arrow record batch and
+    is sent as soon as it is encoded. Raises ImportError without pyarrow.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _arrow_schema(pa)
+    sink = _ChunkSink()
+    if fmt == "parquet":
+        writer = pq.ParquetWriter(sink, schema, compression="snappy")
+    else:
+        writer = pa.ipc.new_stream(sink, schema)
+
+    def generate():
+        for batch in _iter_record_batches(qs, pa, schema):
+            if fmt == "parquet":
+                writer.write_table(pa.Table.from_batches([batch], schema=schema))
+            else:
+                writer.write_batch(batch)
+            yield sink.drain()
+        writer.close()
+        yield sink.drain()
+
+    return generate()
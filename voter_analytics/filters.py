@@ -0,0 +1,171 @@
+# File: voter_analytics/filters.py
+# Author: María Díaz Garrido
+# Description: The voter filters. VoterFilter parses and validates a query
+#              string once, has a canonical form (and hash) that every cache
+#              and export keys on, and compiles to a Q for Voter or for
+#              VoterSummary, so every voter page applies filters identically.
+
+import hashlib
+from dataclasses import dataclass
+from datetime import date
+
+from django.db.models import Q
+from django.utils.http import urlencode
+
+
+ELECTION_FIELDS = ("v20state", "v21town", "v21primary", "v22general", "v23town")
+ELECTION_MODES = ("all", "any")
+CHECKED_VALUES = ("on", "true", "1")
+
+
+def birth_year_range(min_year=None, max_year=None):
+    """Return a Q restricting date_birth to a range of birth years.
+
+    Expressed as plain date comparisons rather than date_birth__year so the
+    database can answer it from an index on date_birth.
+    """
+    q = Q()
+    if min_year is not None:
+        q &= Q(date_birth__gte=date(min_year, 1, 1))
+    if max_year is not None:
+        q &= Q(date_birth__lt=date(max_year + 1, 1, 1))
+    return q
+
+
+def election_mask(elections):
+    """Bitmask with the bit of every election field in `elections` set."""
+    mask = 0
+    for field in elections:
+        mask |= 1 << ELECTION_FIELDS.index(field)
+    return mask
+
+
+ALL_MASKS = range(1 << len(ELECTION_FIELDS))
+
+
+def masks_containing(mask):
+    """Every participation bitmask that includes all the bits of `mask`."""
+    return [m for m in ALL_MASKS if m & mask == mask]
+
+
+def masks_overlapping(mask):
+    """Every participation bitmask sharing at least one bit with `mask`."""
+    return [m for m in ALL_MASKS if m & mask]
+
+
+def masks_with_at_least(k):
+    """Every participation bitmask with k or more bits set."""
+    return [m for m in ALL_MASKS if bin(m).count("1") >= k]
+
+
+def participation_q(elections=(), election_mode="all", min_elections=None, count_field=None):
+    """Q over the participation bitmask for the election filters.
+
+    "Voted in all of" / "any of" the checked elections become a single
+    participation IN (...) predicate over the at most 32 matching masks, so
+    an index on participation answers it. "At least K" uses `count_field`
+    when the model stores the bit count, otherwise the mask list again.
+    """
+    q = Q()
+    if elections:
+        mask = election_mask(elections)
+        masks = masks_overlapping(mask) if election_mode == "any" else masks_containing(mask)
+        q &= Q(participation__in=masks)
+    if min_elections:
+        if count_field:
+            q &= Q(**{f"{count_field}__gte": min_elections})
+        else:
+            q &= Q(participation__in=masks_with_at_least(min_elections))
+    return q
+
+
+def _to_int(value, low, high):
+    """int(value) if it is a whole number within [low, high], else None."""
+    try:
+        number = int(str(value).strip())
+    except (TypeError, ValueError):
+        return None
+    return number if low <= number <= high else None
+
+
+@dataclass(frozen=True)
+class VoterFilter:
+    """An immutable, validated set of voter filters.
+
+    Build it with VoterFilter.from_query(request.GET); anything missing or
+    malformed is simply not filtered on. Both spellings used by the pages
+    are accepted: voter_score or score, and elections either as checkbox
+    keys (v20state=on) or as a repeated elections=v20state parameter.
+    """
+    party: str = None
+    min_year: int = None
+    max_year: int = None
+    voter_score: int = None
+    elections: tuple = ()
+    election_mode: str = "all"
+    min_elections: int = None
+
+    @classmethod
+    def from_query(cls, query):
+        party = (query.get("party") or "").strip().upper()
+        score = query.get("voter_score") or query.get("score")
+
+        checked = set(query.getlist("elections")) if hasattr(query, "getlist") else set()
+        checked.update(f for f in ELECTION_FIELDS if str(query.get(f, "")).lower() in CHECKED_VALUES)
+
+        mode = query.get("election_mode")
+        return cls(
+            party=party if party.isalnum() and len(party) <= 2 else None,
+            min_year=_to_int(query.get("min_year"), 1, 9998),
+            max_year=_to_int(query.get("max_year"), 1, 9998),
+            voter_score=_to_int(score, 0, 2 ** 31 - 1),
+            elections=tuple(f for f in ELECTION_FIELDS if f in checked),
+            election_mode=mode if mode in ELECTION_MODES else "all",
+            min_elections=_to_int(query.get("min_elections"), 1, len(ELECTION_FIELDS)),
+        )
+
+    def params(self):
+        """Canonical (key, value) pairs; equal filters give equal params."""
+        pairs = [
+            ("party", self.party),
+            ("min_year", self.min_year),
+            ("max_year", self.max_year),
+            ("voter_score", self.voter_score),
+        ]
+        pairs += [(f, "on") for f in self.elections]
+        if self.elections and self.election_mode != "all":
+            pairs.append(("election_mode", self.election_mode))
+        pairs.append(("min_elections", self.min_elections))
+        return [(k, str(v)) for k, v in pairs if v is not None]
+
+    def querystring(self):
+        return urlencode(self.params())
+
+    @property
+    def digest(self):
+        """Stable hash of the filter, for cache keys and ETags."""
+        return hashlib.sha1(self.querystring().encode("utf-8")).hexdigest()
+
+    def q(self):
+        """Q selecting the matching Voter rows."""
+        q = Q()
+        if self.party:
+            q &= Q(party=self.party)
+        q &= birth_year_range(self.min_year, self.max_year)
+        if self.voter_score is not None:
+            q &= Q(voter_score=self.voter_score)
+        return q & participation_q(self.elections, self.election_mode, self.min_elections,
+                                   count_field="participation_count")
+
+    def summary_q(self):
+        """Q selecting the matching VoterSummary rows."""
+        q = Q()
+        if self.party:
+            q &= Q(party=self.party)
+        if self.min_year is not None:
+            q &= Q(birth_year__gte=self.min_year)
+        if self.max_year is not None:
+            q &= Q(birth_year__lte=self.max_year)
+        if self.voter_score is not None:
+            q &= Q(voter_score=self.voter_score)
+        return q & participation_q(self.elections, self.election_mode, self.min_elections)
@@ -2,12 +2,25 @@
 # voter_analytics/forms.py
 from django import forms
 from .models import Voter
+from .choices import filter_choices
 from django.db.models import Min, Max
 
 class VoterFilterForm(forms.Form):
     def __init__(self, *args, party_choices=None, year_choices=None, score_choices=None, **kwargs):
         super().__init__(*args, **kwargs)
 
+        # Lists not passed in come from the cached choice provider.
+        if party_choices is None or year_choices is None or score_choices is None:
+            choices = filter_choices()
+            party_choices = choices["party"] if party_choices is None else party_choices
+            year_choices = choices["year"] if year_choices is None else year_choices
+            score_choices = choices["score"] if score_choices is None else score_choices
+
+        self.fields["q"] = forms.CharField(
+            required=False,
+            label="Search",
+            widget=forms.TextInput(attrs={"placeholder": "Name, street or ZIP"})
+        )
         self.fields["party"] = forms.ChoiceField(
             choices=[("", "Any")] + [(p, p) for p in party_choices or []],
             required=False,
@@ -34,4 +47,16 @@ class VoterFilterForm(forms.Form):
         self.fields["v21town"]     = forms.BooleanField(required=False, label="2021 Town")
         self.fields["v21primary"]  = forms.BooleanField(required=False, label="2021 Primary")
         self.fields["v22general"]  = forms.BooleanField(required=False, label="2022 General")
-        self.fields["v23town"]     = forms.BooleanField(required=False, label="2023 Town")
\ No newline at end of file
+        self.fields["v23town"]     = forms.BooleanField(required=False, label="2023 Town")
+
+        # How the checked elections combine, and "voted in at least K"
+        self.fields["election_mode"] = forms.ChoiceField(
+            choices=[("all", "All of"), ("any", "Any of")],
+            required=False,
+            label="Voted in"
+        )
+        self.fields["min_elections"] = forms.ChoiceField(
+            choices=[("", "Any")] + [(str(k), str(k)) for k in range(1, 6)],
+            required=False,
+            label="At least K elections"
+        )
@@ -0,0 +1,228 @@
+# File: voter_analytics/importer.py
+# Author: María Díaz Garrido
+# Description: Streams a voter CSV export into the Voter table. The file is
+#              read in chunks, each chunk is parsed (optionally in a pool of
+#              worker processes) and then bulk-inserted in its own transaction.
+#              In sync mode rows are upserted on voter_id instead, unchanged
+#              rows are skipped and voters missing from the file are deleted.
+
+import time
+from dataclasses import dataclass, field
+from multiprocessing import Pool
+
+from django.db import IntegrityError, transaction
+
+from .models import Voter
+from .parsing import FIELDS, iter_chunks, open_csv, parse_chunk
+from .signals import voters_loaded
+
+
+DEFAULT_CHUNK_SIZE = 5000
+DELETE_BATCH_SIZE = 1000
+
+# Columns rewritten when an existing voter_id comes back with a new row hash.
+UPDATE_FIELDS = [f for f in FIELDS if f != "voter_id"]
+PRECINCT = FIELDS.index("precinct_number")
+
+
+class ImportRefused(Exception):
+    """The file cannot be loaded into the Voter table as it is now."""
+
+
+@dataclass
+class ImportStats:
+    """Counters reported back to the caller of import_voters()."""
+    rows: int = 0
+    created: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    deleted: int = 0
+    errors: list = field(default_factory=list)
+    # precincts whose voters were added, changed or removed, so derived
+    # per-precinct tables can refresh just those (all of them if truncated)
+    precincts: set = field(default_factory=set)
+    truncated: bool = False
+    # set when sync left voters missing from the file alone because some
+    # rows could not be parsed (their voters would look missing too)
+    deletes_skipped: bool = False
+    started: float = field(default_factory=time.monotonic)
+
+    @property
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+
+def _parsed_chunks(chunks, workers):
+    """Parse raw chunks in-process or through a multiprocessing pool."""
+    if workers <= 1:
+        for chunk in chunks:
+            yield parse_chunk(chunk)
+        return
+    with Pool(processes=workers) as pool:
+        # imap keeps the chunks in file order while the workers run ahead
+        yield from pool.imap(parse_chunk, chunks)
+
+
+def _insert(rows, stats, seen):
+    """Bulk-insert one chunk, skipping voter ids already seen in the file."""
+    voters = []
+    for row in rows:
+        voter_id = row[0]
+        if voter_id is not None:
+            if voter_id in seen:
+                stats.errors.append((None, f"repeated voter id {voter_id} skipped"))
+                continue
+            seen.add(voter_id)
+        voters.append(Voter(**dict(zip(FIELDS, row))))
+    with transaction.atomic():
+        Voter.objects.bulk_create(voters, batch_size=1000)
+    stats.precincts.update(voter.precinct_number for voter in voters)
+    return len(voters)
+
+
+def _sync(rows, stats, seen):
+    """Upsert the rows of one chunk whose hash differs from the stored one."""
+    by_id = {}
+    for row in rows:
+        voter_id = row[0]
+        if voter_id is None:
+            stats.errors.append((None, "row without voter id skipped in sync mode"))
+            continue
+        by_id[voter_id] = row  # a repeated id within the file: last one wins
+    seen.update(by_id)
+
+    stored = {
+        voter_id: (digest, precinct)
+        for voter_id, digest, precinct in Voter.objects.filter(voter_id__in=list(by_id))
+                                                       .values_list("voter_id", "row_hash", "precinct_number")
+    }
+    changed = []
+    for voter_id, row in by_id.items():
+        digest = row[-1]
+        old = stored.get(voter_id)
+        if old and old[0] == digest:
+            stats.unchanged += 1
+            continue
+        if old:
+            stats.updated += 1
+            stats.precincts.add(old[1])
+        else:
+            stats.created += 1
+        stats.precincts.add(row[PRECINCT])
+        changed.append(Voter(**dict(zip(FIELDS, row))))
+
+    if changed:
+        with transaction.atomic():
+            Voter.objects.bulk_create(
+                changed,
+                batch_size=1000,
+                update_conflicts=True,
+                unique_fields=["voter_id"],
+                update_fields=UPDATE_FIELDS,
+            )
+
+
+def _check_append():
+    """Appending needs an empty table: voter_id is unique."""
+    loaded = Voter.objects.count()
+    if loaded:
+        raise ImportRefused(
+            f"The Voter table already holds {loaded} voters; use --sync to refresh it "
+            "from the file or --truncate to reload it."
+        )
+
+
+def _check_sync():
+    """Refuse to sync a table that still holds voters loaded without an id.
+
+    They cannot be matched against the file, so every one of them would be
+    inserted again next to its old row.
+    """
+    legacy = Voter.objects.filter(voter_id__isnull=True).count()
+    if legacy:
+        raise ImportRefused(
+            f"{legacy} voters have no voter id (loaded before ids were stored) and "
+            "cannot be matched against the file; reload it once with --truncate, then sync."
+        )
+
+
+def _delete_missing(seen, stats):
+    """Delete voters whose voter_id did not appear in the synced file.
+
+    Voters without a voter_id cannot be matched against the file and are
+    never deleted (_check_sync() refuses to start while there are any).
+    """
+    stale = []
+    rows = (Voter.objects.filter(voter_id__isnull=False)
+                         .values_list("pk", "voter_id", "precinct_number")
+                         .iterator(chunk_size=5000))
+    for pk, voter_id, precinct in rows:
+        if voter_id not in seen:
+            stale.append(pk)
+            stats.precincts.add(precinct)
+    for i in range(0, len(stale), DELETE_BATCH_SIZE):
+        with transaction.atomic():
+            Voter.objects.filter(pk__in=stale[i:i + DELETE_BATCH_SIZE]).delete()
+    return len(stale)
+
+
+def import_voters(path, chunk_size=DEFAULT_CHUNK_SIZE, workers=1, truncate=False,
+                  sync=False, encoding="utf-8", progress=None):
+    """Load every row of the CSV at `path` (plain or .gz) into Voter.
+
+    By default rows are appended, which needs an empty table (or
+    truncate=True): ImportRefused is raised otherwise, and a voter_id
+    repeated in the file is reported as an error. With sync=True the table is brought in line with the
+    file: new voter_ids are inserted, rows whose hash changed are updated and
+    voters absent from the file are deleted. If any row fails to parse the
+    deletions are skipped (stats.deletes_skipped), since the voter on that
+    row would otherwise be deleted as missing. Syncing a table that has
+    voters without a voter_id raises ImportRefused before anything is read.
+
+    `progress`, if given, is called with the running ImportStats after each
+    chunk has been committed. voters_loaded is sent once the file is done.
+    """
+    stats = ImportStats()
+    seen = set()
+
+    if sync:
+        _check_sync()
+    elif not truncate:
+        _check_append()
+    if truncate:
+        Voter.objects.all().delete()
+        stats.truncated = True
+
+    try:
+        with open_csv(path, encoding=encoding) as f:
+            chunks = iter_chunks(f, chunk_size)
+            for rows, errors in _parsed_chunks(chunks, workers):
+                stats.rows += len(rows) + len(errors)
+                stats.errors.extend(errors)
+                if sync:
+                    _sync(rows, stats, seen)
+                else:
+                    stats.created += _insert(rows, stats, seen)
+                if progress:
+                    progress(stats)
+    except IntegrityError as exc:
+        # e.g. another load writing the same voter ids; the chunks before
+        # this one are committed, so the derived tables still follow them
+        voters_loaded.send(sender=Voter, stats=stats)
+        raise ImportRefused(
+            f"Stopped after {stats.created} voters: {exc}. "
+            "Use --sync to finish loading the file, or --truncate to reload it."
+        ) from exc
+
+    if sync:
+        if stats.errors:
+            stats.deletes_skipped = True
+        else:
+            stats.deleted = _delete_missing(seen, stats)
+
+    voters_loaded.send(sender=Voter, stats=stats)
+    return stats
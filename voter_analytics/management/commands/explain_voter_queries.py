@@ -0,0 +1,78 @@
+# File: voter_analytics/management/commands/explain_voter_queries.py
+# Author: María Díaz Garrido
+# Description: `python manage.py explain_voter_queries` prints the database's
+#              query plan for every combination of the voter list filters,
+#              flagging the ones that fall back to a full table scan.
+
+from itertools import combinations
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from voter_analytics.filters import VoterFilter
+from voter_analytics.models import Voter
+from voter_analytics.views import VoterListView
+
+
+def is_full_scan(plan):
+    """True if a plan line reads the whole voter table without an index."""
+    table = Voter._meta.db_table
+    for line in plan.splitlines():
+        if f"SCAN {table}" in line and "USING" not in line:   # SQLite
+            return True
+        if "Seq Scan" in line:                                # PostgreSQL
+            return True
+    return False
+
+
+class Command(BaseCommand):
+    help = "Print EXPLAIN output for each VoterListView filter combination."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--party", default="D")
+        parser.add_argument("--min-year", type=int, default=1960)
+        parser.add_argument("--max-year", type=int, default=1980)
+        parser.add_argument("--voter-score", type=int, default=3)
+        parser.add_argument("--election", default="v20state")
+        parser.add_argument("--min-elections", type=int, default=4)
+        parser.add_argument(
+            "--strict", action="store_true",
+            help="Exit with an error if any combination does a full scan",
+        )
+
+    def handle(self, *args, **options):
+        criteria = {
+            "party": {"party": options["party"]},
+            "birth years": {"min_year": options["min_year"], "max_year": options["max_year"]},
+            "voter score": {"voter_score": options["voter_score"]},
+            "election": {"elections": (options["election"],)},
+            "min elections": {"min_elections": options["min_elections"]},
+        }
+        page_size = VoterListView.paginate_by
+        base = Voter.objects.order_by(*VoterListView.ordering)
+
+        scans = []
+        for n in range(len(criteria) + 1):
+            for names in combinations(criteria, n):
+                kwargs = {}
+                for name in names:
+                    kwargs.update(criteria[name])
+                qs = base.filter(VoterFilter(**kwargs).q())[:page_size]
+                plan = qs.explain()
+
+                label = " + ".join(names) or "no filters"
+                self.stdout.write(self.style.MIGRATE_HEADING(f"== {label}"))
+                self.stdout.write(plan)
+                if is_full_scan(plan):
+                    scans.append(label)
+                    self.stdout.write(self.style.WARNING("full table scan"))
+                self.stdout.write("")
+
+        self.stdout.write(f"Database: {connection.vendor}")
+        if scans:
+            message = f"{len(scans)} combination(s) scan the table: " + ", ".join(scans)
+            if options["strict"]:
+                raise CommandError(message)
+            self.stdout.write(self.style.WARNING(message))
+        else:
+            self.stdout.write(self.style.SUCCESS("No full table scans."))
@@ -0,0 +1,82 @@
+# File: voter_analytics/management/commands/load_voters.py
+# Author: María Díaz Garrido
+# Description: `python manage.py load_voters <path>` loads a voter CSV export
+#              (optionally gzip-compressed) into the Voter table. With --sync
+#              only the difference against the current table is applied.
+
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from voter_analytics.importer import DEFAULT_CHUNK_SIZE, ImportRefused, import_voters
+
+
+class Command(BaseCommand):
+    help = "Stream a voter CSV (plain or .gz) into the Voter table in chunks."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV file to load, plain text or gzip")
+        parser.add_argument(
+            "--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+            help="Rows parsed and committed per transaction (default %(default)s)",
+        )
+        parser.add_argument(
+            "--workers", type=int, default=min(4, os.cpu_count() or 1),
+            help="Parser processes; 1 parses in the main process (default %(default)s)",
+        )
+        parser.add_argument(
+            "--truncate", action="store_true",
+            help="Delete every existing Voter before loading",
+        )
+        parser.add_argument(
+            "--sync", action="store_true",
+            help="Upsert on voter id, skip unchanged rows and delete voters "
+                 "missing from the file (for refreshing a loaded table)",
+        )
+        parser.add_argument("--encoding", default="utf-8")
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        if not os.path.isfile(path):
+            raise CommandError(f"No such file: {path}")
+        if options["chunk_size"] < 1:
+            raise CommandError("--chunk-size must be at least 1")
+        if options["sync"] and options["truncate"]:
+            raise CommandError("--sync and --truncate cannot be combined")
+
+        def progress(stats):
+            if options["verbosity"] >= 2:
+                self.stdout.write(
+                    f"{stats.rows} rows read, {stats.created} created, "
+                    f"{stats.updated} updated ({stats.rows_per_second:,.0f} rows/s)"
+                )
+
+        try:
+            stats = import_voters(
+                path,
+                chunk_size=options["chunk_size"],
+                workers=max(1, options["workers"]),
+                truncate=options["truncate"],
+                sync=options["sync"],
+                encoding=options["encoding"],
+                progress=progress,
+            )
+        except ImportRefused as exc:
+            raise CommandError(str(exc))
+
+        for lineno, message in stats.errors[:20]:
+            self.stderr.write(f"line {lineno}: {message}" if lineno else message)
+        if len(stats.errors) > 20:
+            self.stderr.write(f"... and {len(stats.errors) - 20} more errors")
+        if stats.deletes_skipped:
+            self.stderr.write(self.style.WARNING(
+                "Some rows could not be read, so no voters were deleted; "
+                "fix the file and sync again to remove voters missing from it."
+            ))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {stats.created}, updated {stats.updated}, unchanged "
+            f"{stats.unchanged}, deleted {stats.deleted} voters from {stats.rows} "
+            f"rows in {stats.elapsed:.1f}s ({stats.rows_per_second:,.0f} rows/s), "
+            f"{len(stats.errors)} errors"
+        ))
@@ -0,0 +1,21 @@
+# File: voter_analytics/management/commands/rebuild_voter_summary.py
+# Author: María Díaz Garrido
+# Description: `python manage.py rebuild_voter_summary` recomputes the
+#              VoterSummary and PrecinctTurnout tables by hand (load_voters
+#              already keeps them up to date).
+
+from django.core.management.base import BaseCommand
+
+from voter_analytics.caching import bump_data_version
+from voter_analytics.summary import rebuild_voter_summary, refresh_precinct_turnout
+
+
+class Command(BaseCommand):
+    help = "Recompute the VoterSummary and PrecinctTurnout tables used by the graphs pages."
+
+    def handle(self, *args, **options):
+        rows = rebuild_voter_summary()
+        self.stdout.write(self.style.SUCCESS(f"VoterSummary rebuilt with {rows} rows"))
+        rows = refresh_precinct_turnout()
+        self.stdout.write(self.style.SUCCESS(f"PrecinctTurnout rebuilt with {rows} rows"))
+        bump_data_version()
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voter_analytics', '0003_alter_voter_address_apartment_number_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='voter',
+            name='row_hash',
+            field=models.CharField(blank=True, editable=False, max_length=40),
+        ),
+        migrations.AddField(
+            model_name='voter',
+            name='voter_id',
+            field=models.CharField(blank=True, max_length=32, null=True, unique=True),
+        ),
+    ]
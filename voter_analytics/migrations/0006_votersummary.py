@@ -0,0 +1,64 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:09
+
+from django.db import migrations, models
+from django.db.models import Case, Count, IntegerField, Sum, Value, When
+from django.db.models.functions import ExtractYear
+
+
+ELECTION_FIELDS = ("v20state", "v21town", "v21primary", "v22general", "v23town")
+
+
+def build_summary(apps, schema_editor):
+    """Fill VoterSummary from the voters already in the database."""
+    Voter = apps.get_model("voter_analytics", "Voter")
+    VoterSummary = apps.get_model("voter_analytics", "VoterSummary")
+
+    participation = Value(0)
+    for bit, field in enumerate(ELECTION_FIELDS):
+        participation = participation + Case(
+            When(**{field: 1}, then=Value(1 << bit)), default=Value(0), output_field=IntegerField()
+        )
+    groups = (
+        Voter.objects.annotate(birth_year=ExtractYear("date_birth"), participation=participation)
+                     .values("party", "birth_year", "voter_score", "participation")
+                     .annotate(voters=Count("id"), **{f: Sum(f) for f in ELECTION_FIELDS})
+                     .order_by()
+    )
+    VoterSummary.objects.bulk_create(
+        [
+            VoterSummary(
+                party=g["party"], birth_year=g["birth_year"], voter_score=g["voter_score"],
+                participation=g["participation"], voters=g["voters"],
+                **{f: g[f] or 0 for f in ELECTION_FIELDS},
+            )
+            for g in groups
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voter_analytics', '0005_voter_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VoterSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('party', models.CharField(blank=True, max_length=2, null=True)),
+                ('birth_year', models.IntegerField(blank=True, null=True)),
+                ('voter_score', models.IntegerField(default=0)),
+                ('participation', models.SmallIntegerField(default=0)),
+                ('voters', models.IntegerField(default=0)),
+                ('v20state', models.IntegerField(default=0)),
+                ('v21town', models.IntegerField(default=0)),
+                ('v21primary', models.IntegerField(default=0)),
+                ('v22general', models.IntegerField(default=0)),
+                ('v23town', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(build_summary, migrations.RunPython.noop),
+    ]
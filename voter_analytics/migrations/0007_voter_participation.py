@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:11
+
+from django.db import migrations, models
+from django.db.models import Case, IntegerField, Value, When
+
+
+ELECTION_FIELDS = ("v20state", "v21town", "v21primary", "v22general", "v23town")
+
+
+def fill_participation(apps, schema_editor):
+    """Compute participation / participation_count for the existing voters."""
+    Voter = apps.get_model("voter_analytics", "Voter")
+    mask, count = Value(0), Value(0)
+    for bit, field in enumerate(ELECTION_FIELDS):
+        mask = mask + Case(When(**{field: 1}, then=Value(1 << bit)), default=Value(0), output_field=IntegerField())
+        count = count + Case(When(**{field: 1}, then=Value(1)), default=Value(0), output_field=IntegerField())
+    Voter.objects.update(participation=mask, participation_count=count)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voter_analytics', '0006_votersummary'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='voter',
+            name='voter_elections_idx',
+        ),
+        migrations.AddField(
+            model_name='voter',
+            name='participation',
+            field=models.SmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='voter',
+            name='participation_count',
+            field=models.SmallIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='voter',
+            index=models.Index(fields=['participation'], name='voter_participation_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='voter',
+            index=models.Index(fields=['participation_count'], name='voter_participation_count_idx'),
+        ),
+        migrations.RunPython(fill_participation, migrations.RunPython.noop),
+    ]
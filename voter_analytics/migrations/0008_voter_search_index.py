@@ -0,0 +1,68 @@
+# Full-text index over voter names and addresses, used by search.py.
+
+from django.db import migrations
+
+
+FTS_TABLE = "voter_analytics_voter_fts"
+VOTER_TABLE = "voter_analytics_voter"
+COLUMNS = "first_name, last_name, address_street_name, address_zip_code"
+
+SQLITE_CREATE = [
+    # external-content FTS5 table: it stores only the index, not the text
+    f"""CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        {COLUMNS}, content='{VOTER_TABLE}', content_rowid='id', prefix='2 3'
+    )""",
+    f"""CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON {VOTER_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, {COLUMNS})
+        VALUES (new.id, new.first_name, new.last_name, new.address_street_name, new.address_zip_code);
+    END""",
+    f"""CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON {VOTER_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {COLUMNS})
+        VALUES ('delete', old.id, old.first_name, old.last_name, old.address_street_name, old.address_zip_code);
+    END""",
+    f"""CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE OF {COLUMNS} ON {VOTER_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {COLUMNS})
+        VALUES ('delete', old.id, old.first_name, old.last_name, old.address_street_name, old.address_zip_code);
+        INSERT INTO {FTS_TABLE}(rowid, {COLUMNS})
+        VALUES (new.id, new.first_name, new.last_name, new.address_street_name, new.address_zip_code);
+    END""",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+SQLITE_DROP = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ai",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_au",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+PG_CREATE = [
+    f"""CREATE INDEX voter_search_idx ON {VOTER_TABLE} USING GIN (
+        to_tsvector('simple', coalesce(first_name, '') || ' ' || coalesce(last_name, '') || ' ' ||
+                    coalesce(address_street_name, '') || ' ' || coalesce(address_zip_code, ''))
+    )""",
+]
+PG_DROP = ["DROP INDEX IF EXISTS voter_search_idx"]
+
+
+def _run(schema_editor, statements):
+    for sql in statements.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(sql)
+
+
+def create_search_index(apps, schema_editor):
+    _run(schema_editor, {"sqlite": SQLITE_CREATE, "postgresql": PG_CREATE})
+
+
+def drop_search_index(apps, schema_editor):
+    _run(schema_editor, {"sqlite": SQLITE_DROP, "postgresql": PG_DROP})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voter_analytics', '0007_voter_participation'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
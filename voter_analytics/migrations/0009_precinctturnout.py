@@ -0,0 +1,67 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:15
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+ELECTION_FIELDS = ("v20state", "v21town", "v21primary", "v22general", "v23town")
+
+
+def build_turnout(apps, schema_editor):
+    """Fill PrecinctTurnout from the voters already in the database."""
+    Voter = apps.get_model("voter_analytics", "Voter")
+    PrecinctTurnout = apps.get_model("voter_analytics", "PrecinctTurnout")
+
+    groups = (
+        Voter.objects.values("precinct_number", "address_zip_code", "party")
+                     .annotate(voters=Count("id"), **{f: Sum(f) for f in ELECTION_FIELDS})
+                     .order_by()
+    )
+    PrecinctTurnout.objects.bulk_create(
+        [
+            PrecinctTurnout(
+                precinct_number=g["precinct_number"], address_zip_code=g["address_zip_code"],
+                party=g["party"], voters=g["voters"],
+                **{f: g[f] or 0 for f in ELECTION_FIELDS},
+            )
+            for g in groups
+        ],
+        batch_size=1000,
+    )
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voter_analytics', '0008_voter_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PrecinctTurnout',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('precinct_number', models.CharField(blank=True, max_length=10, null=True)),
+                ('address_zip_code', models.CharField(blank=True, max_length=10, null=True)),
+                ('party', models.CharField(blank=True, max_length=2, null=True)),
+                ('voters', models.IntegerField(default=0)),
+                ('v20state', models.IntegerField(default=0)),
+                ('v21town', models.IntegerField(default=0)),
+                ('v21primary', models.IntegerField(default=0)),
+                ('v22general', models.IntegerField(default=0)),
+                ('v23town', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='voter',
+            index=models.Index(fields=['precinct_number', 'address_zip_code'], name='voter_precinct_zip_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='precinctturnout',
+            index=models.Index(fields=['precinct_number', 'address_zip_code'], name='turnout_precinct_zip_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='precinctturnout',
+            index=models.Index(fields=['address_zip_code'], name='turnout_zip_idx'),
+        ),
+        migrations.RunPython(build_turnout, migrations.RunPython.noop),
+    ]
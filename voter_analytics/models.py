@@ -16,6 +16,11 @@ from datetime import date
 # Create your models here.
 
 class Voter(models.Model):
+    # Column 0 of the CSV export; stable across exports, so sync keys on it.
+    voter_id = models.CharField(max_length=32, unique=True, blank=True, null=True)
+    # SHA-1 of the raw CSV row the record was last loaded from.
+    row_hash = models.CharField(max_length=40, blank=True, editable=False)
+
     first_name = models.TextField(blank=True)
     last_name = models.TextField(blank=True)
     
@@ -38,6 +43,25 @@ class Voter(models.Model):
     
     voter_score = models.IntegerField(default=0)
 
+    # Derived from the five election flags by the loader: bit i is set when
+    # the i-th of v20state..v23town is 1, and the count is its number of bits.
+    participation = models.SmallIntegerField(default=0)
+    participation_count = models.SmallIntegerField(default=0)
+
+    class Meta:
+        # Match the access paths of VoterListView: the name sort (id last so
+        # it is a total order) and the party / birth date / score filters.
+        indexes = [
+            models.Index(fields=["last_name", "first_name", "id"], name="voter_name_idx"),
+            models.Index(fields=["date_birth"], name="voter_birth_idx"),
+            models.Index(fields=["party", "last_name", "first_name", "id"], name="voter_party_name_idx"),
+            models.Index(fields=["party", "date_birth"], name="voter_party_birth_idx"),
+            models.Index(fields=["voter_score", "date_birth"], name="voter_score_birth_idx"),
+            models.Index(fields=["participation"], name="voter_participation_idx"),
+            models.Index(fields=["participation_count"], name="voter_participation_count_idx"),
+            models.Index(fields=["precinct_number", "address_zip_code"], name="voter_precinct_zip_idx"),
+        ]
+
     def __str__(self):
         apt = f" Apt {self.address_apartment_number}" if self.address_apartment_number is not None else ""
         return (
@@ -48,99 +72,82 @@ class Voter(models.Model):
         )
 
 
-def load_data():
-    """Function to load data records from CSV file into Django model instances."""
-    filename = "/Users/Maria/Desktop/MARTIN/CS 412/django/newton_voters.csv"
-
-    def to_int_strict(s):
-        if s in (None, "", "NULL", "None"):
-            return None
-        s = str(s).strip()
-        return int(s) if s.isdigit() else None 
-
-    def to_date(s):
-        if s in (None, "", "NULL", "None"):
-            return None
-        s = str(s).strip()
-        from datetime import date, datetime
-        try:
-            return date.fromisoformat(s)
-        except Exception:
-            pass
-        for fmt in ("%m/%d/%y %H:%M", "%m/%d/%y", "%m/%d/%Y"):
-            try:
-                return datetime.strptime(s, fmt).date()
-            except Exception:
-                continue
-        return None
-
-    def to_bool_int(s):
-        if s is None:
-            return None
-        s_up = str(s).strip().upper()
-        if s_up in ("TRUE", "T", "1", "YES", "Y"):
-            return 1
-        if s_up in ("FALSE", "F", "0", "NO", "N", ""):
-            return 0
-        return None
-
-    def clean_party(s):
-        if s in (None, "", "NULL", "None"):
-            return None
-        return s.strip().upper()[:1] 
-    
-    def keep_str(s):
-        s = (s or "").strip()
-        return s or None
-
-    def keep_zip(s):
-        s = (s or "").strip()
-        if s.isdigit():          
-            return s.zfill(5)
-        return s or None
-
-
-    batch, created = [], 0
-    BATCH_SIZE = 2000
-
-    import csv
-    with open(filename, "r", newline="", encoding="utf-8") as f:
-        reader = csv.reader(f)
-        next(reader, None) 
-
-        for lineno, line in enumerate(reader, start=2):  
-            try:
-                voter = Voter(
-                    last_name=line[1].strip() if len(line) > 1 else "",
-                    first_name=line[2].strip() if len(line) > 2 else "",
-                    address_street_number = keep_str(line[3]) if len(line) > 3 else None,
-                    address_street_name = keep_str(line[4]) if len(line) > 4 else None,
-                    address_apartment_number = keep_str(line[5]) if len(line) > 5 else None,
-                    address_zip_code = keep_zip(line[6]) if len(line) > 6 else None,
-                    date_birth=to_date(line[7]) if len(line) > 7 else None,
-                    date_registration=to_date(line[8]) if len(line) > 8 else None,
-                    party=clean_party(line[9]) if len(line) > 9 else None,
-                    precinct_number=(line[10].strip() or None) if len(line) > 10 else None,
-                    v20state=to_bool_int(line[11]) if len(line) > 11 else None,
-                    v21town=to_bool_int(line[12]) if len(line) > 12 else None,
-                    v21primary=to_bool_int(line[13]) if len(line) > 13 else None,
-                    v22general=to_bool_int(line[14]) if len(line) > 14 else None,
-                    v23town=to_bool_int(line[15]) if len(line) > 15 else None,
-                    voter_score=to_int_strict(line[16]) if len(line) > 16 else 0,
-                )
-                batch.append(voter)
-
-                if len(batch) >= BATCH_SIZE:
-                    Voter.objects.bulk_create(batch, ignore_conflicts=False)
-                    created += len(batch)
-                    batch.clear()
-
-            except Exception as e:
-                print(f"[load_data] error on CSV line {lineno}: {e}")
-                print(f"line={line}")
-
-    if batch:
-        Voter.objects.bulk_create(batch, ignore_conflicts=False)
-        created += len(batch)
-
-    print(f"Created {created} Voters (total now {Voter.objects.count()})")
+class VoterSummary(models.Model):
+    """Pre-aggregated Voter counts for the graphs page.
+
+    One row per (party, birth_year, voter_score, participation) combination,
+    where participation is a bitmask of the elections voted in (bit i set for
+    the i-th field of filters.ELECTION_FIELDS). Rebuilt from Voter by
+    summary.rebuild_voter_summary() after every import.
+    """
+    party = models.CharField(max_length=2, blank=True, null=True)
+    birth_year = models.IntegerField(blank=True, null=True)
+    voter_score = models.IntegerField(default=0)
+    participation = models.SmallIntegerField(default=0)
+
+    voters = models.IntegerField(default=0)
+    v20state = models.IntegerField(default=0)
+    v21town = models.IntegerField(default=0)
+    v21primary = models.IntegerField(default=0)
+    v22general = models.IntegerField(default=0)
+    v23town = models.IntegerField(default=0)
+
+    def __str__(self):
+        return (
+            f"party={self.party} born={self.birth_year} score={self.voter_score} "
+            f"participation={self.participation:05b}: {self.voters} voters"
+        )
+
+
+class PrecinctTurnout(models.Model):
+    """Voter counts and per-election votes by precinct, ZIP code and party.
+
+    Summing a precinct's (or a ZIP's) rows gives its size, the rows
+    themselves its party split, and vNN / voters its turnout rate. Refreshed
+    per precinct by summary.refresh_precinct_turnout() after each import.
+    """
+    precinct_number = models.CharField(max_length=10, blank=True, null=True)
+    address_zip_code = models.CharField(max_length=10, blank=True, null=True)
+    party = models.CharField(max_length=2, blank=True, null=True)
+
+    voters = models.IntegerField(default=0)
+    v20state = models.IntegerField(default=0)
+    v21town = models.IntegerField(default=0)
+    v21primary = models.IntegerField(default=0)
+    v22general = models.IntegerField(default=0)
+    v23town = models.IntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["precinct_number", "address_zip_code"], name="turnout_precinct_zip_idx"),
+            models.Index(fields=["address_zip_code"], name="turnout_zip_idx"),
+        ]
+
+    def __str__(self):
+        return f"precinct {self.precinct_number} / {self.address_zip_code} / {self.party}: {self.voters} voters"
+
+
+class DataVersion(models.Model):
+    """Version token of a data set (one row per name, e.g. "voters").
+
+    Kept in the database rather than the cache so that a bump made by one
+    process (load_voters, rebuild_voter_summary) is seen by every web worker.
+    """
+    name = models.CharField(max_length=50, unique=True)
+    token = models.CharField(max_length=32)
+    updated = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.name} @ {self.token} ({self.updated})"
+
+
+def load_data(filename):
+    """Load voter records from a CSV export (plain or .gz) into the database.
+
+    Kept for use from the shell; see the load_voters management command.
+    """
+    from .importer import import_voters
+
+    stats = import_voters(filename)
+    print(f"Created {stats.created} Voters (total now {Voter.objects.count()})")
+    return stats
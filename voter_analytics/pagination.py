@@ -0,0 +1,132 @@
+# File: voter_analytics/pagination.py
+# Author: María Díaz Garrido
+# Description: Pagination helpers for the voter list: keyset (seek) pages
+#              addressed by opaque cursor tokens, and a Paginator whose total
+#              count is cached instead of recomputed on every request.
+
+import base64
+import json
+
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+
+COUNT_CACHE_TIMEOUT = 300
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(values, direction):
+    """Pack the sort key of a row and a direction into an opaque token."""
+    raw = json.dumps([direction, list(values)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token, width):
+    """Inverse of encode_cursor(); raises InvalidCursor on anything malformed."""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        direction, values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, TypeError):
+        raise InvalidCursor(token)
+    if direction not in ("next", "prev") or not isinstance(values, list) or len(values) != width:
+        raise InvalidCursor(token)
+    if not all(isinstance(v, (str, int)) for v in values):
+        raise InvalidCursor(token)
+    return direction, values
+
+
+def seek_q(ordering, values, after=True):
+    """Q selecting the rows strictly after (or before) `values` in `ordering`.
+
+    Equivalent to the row comparison (a, b, c) > (x, y, z), spelled out as
+    a > x OR (a = x AND b > y) OR (a = x AND b = y AND c > z) so it works on
+    every backend. The redundant a >= x in front lets the planner seek into
+    the composite index on the same columns instead of walking it from the
+    start.
+    """
+    op = "gt" if after else "lt"
+    q = Q()
+    for i, field in enumerate(ordering):
+        term = Q(**{f"{field}__{op}": values[i]})
+        for prev_field, prev_value in zip(ordering[:i], values[:i]):
+            term &= Q(**{prev_field: prev_value})
+        q |= term
+    return Q(**{f"{ordering[0]}__{op}e": values[0]}) & q
+
+
+class KeysetPage:
+    """One page of a keyset-paginated queryset."""
+
+    def __init__(self, object_list, ordering, has_next, has_previous):
+        self.object_list = object_list
+        self.ordering = ordering
+        self.has_next = has_next
+        self.has_previous = has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def _key(self, obj):
+        return [getattr(obj, f) for f in self.ordering]
+
+    @property
+    def next_cursor(self):
+        if not self.has_next or not self.object_list:
+            return None
+        return encode_cursor(self._key(self.object_list[-1]), "next")
+
+    @property
+    def previous_cursor(self):
+        if not self.has_previous or not self.object_list:
+            return None
+        return encode_cursor(self._key(self.object_list[0]), "prev")
+
+
+def keyset_paginate(qs, ordering, page_size, cursor=None):
+    """Return the KeysetPage of `qs` that `cursor` points at (first page if None).
+
+    `ordering` must be a unique, ascending sort key, e.g. ending in "id".
+    """
+    ordering = tuple(ordering)
+    if not cursor:
+        rows = list(qs.order_by(*ordering)[:page_size + 1])
+        return KeysetPage(rows[:page_size], ordering, len(rows) > page_size, False)
+
+    direction, values = decode_cursor(cursor, len(ordering))
+    if direction == "next":
+        rows = list(qs.filter(seek_q(ordering, values)).order_by(*ordering)[:page_size + 1])
+        return KeysetPage(rows[:page_size], ordering, len(rows) > page_size, True)
+
+    descending = [f"-{f}" for f in ordering]
+    rows = list(qs.filter(seek_q(ordering, values, after=False)).order_by(*descending)[:page_size + 1])
+    has_previous = len(rows) > page_size
+    rows = rows[:page_size]
+    rows.reverse()
+    return KeysetPage(rows, ordering, True, has_previous)
+
+
+def cached_count(qs, cache_key, timeout=COUNT_CACHE_TIMEOUT):
+    """qs.count(), remembered in the Django cache under cache_key."""
+    return cache.get_or_set(cache_key, qs.count, timeout)
+
+
+class CachedCountPaginator(Paginator):
+    """Paginator that reads the total from the cache when it can."""
+
+    def __init__(self, *args, count_cache_key=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.count_cache_key = count_cache_key
+
+    @cached_property
+    def count(self):
+        if self.count_cache_key is None:
+            return super().count
+        return cached_count(self.object_list, self.count_cache_key)
@@ -0,0 +1,187 @@
+# File: voter_analytics/parsing.py
+# Author: María Díaz Garrido
+# Description: Pure-Python parsing of the voter CSV export. Nothing in here
+#              touches Django, so the functions can run inside worker
+#              processes started by the load_voters management command.
+
+import csv
+import gzip
+import hashlib
+import io
+from datetime import date, datetime
+from functools import lru_cache
+
+
+# Order of the values produced by parse_row(); matches the Voter model fields.
+FIELDS = (
+    "voter_id",
+    "last_name",
+    "first_name",
+    "address_street_number",
+    "address_street_name",
+    "address_apartment_number",
+    "address_zip_code",
+    "date_birth",
+    "date_registration",
+    "party",
+    "precinct_number",
+    "v20state",
+    "v21town",
+    "v21primary",
+    "v22general",
+    "v23town",
+    "voter_score",
+    "participation",
+    "participation_count",
+    "row_hash",
+)
+
+NULLS = frozenset(("", "NULL", "None"))
+TRUE_VALUES = frozenset(("TRUE", "T", "1", "YES", "Y"))
+FALSE_VALUES = frozenset(("FALSE", "F", "0", "NO", "N", ""))
+DATE_FORMATS = ("%m/%d/%y %H:%M", "%m/%d/%y", "%m/%d/%Y")
+
+
+def to_int_strict(s):
+    """Return s as an int, or None if it is not made only of digits."""
+    if s is None:
+        return None
+    s = s.strip()
+    return int(s) if s.isdigit() else None
+
+
+@lru_cache(maxsize=65536)
+def to_date(s):
+    """Parse the date formats found in the export.
+
+    Birth and registration dates repeat a lot across a city, so results are
+    memoized and each distinct string is only parsed once per process.
+    """
+    s = s.strip()
+    if s in NULLS:
+        return None
+    try:
+        return date.fromisoformat(s)
+    except ValueError:
+        pass
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(s, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def to_bool_int(s):
+    """Map the TRUE/FALSE style flags to 1/0 (None when unrecognised)."""
+    if s is None:
+        return None
+    s_up = s.strip().upper()
+    if s_up in TRUE_VALUES:
+        return 1
+    if s_up in FALSE_VALUES:
+        return 0
+    return None
+
+
+def clean_party(s):
+    if s is None:
+        return None
+    s = s.strip()
+    if s in NULLS:
+        return None
+    return s.upper()[:1]
+
+
+def keep_str(s):
+    s = (s or "").strip()
+    return s or None
+
+
+def keep_zip(s):
+    s = (s or "").strip()
+    if s.isdigit():
+        return s.zfill(5)
+    return s or None
+
+
+def participation(flags):
+    """Bitmask of the elections voted in; bit i is the i-th of v20state..v23town."""
+    mask = 0
+    for bit, flag in enumerate(flags):
+        if flag == 1:
+            mask |= 1 << bit
+    return mask
+
+
+def row_hash(line):
+    """Fingerprint of the raw CSV row, used by sync to skip unchanged rows."""
+    return hashlib.sha1("\x1f".join(line).encode("utf-8")).hexdigest()
+
+
+def parse_row(line):
+    """Convert one CSV row into a tuple of values ordered like FIELDS."""
+    digest = row_hash(line)
+    line = line + [""] * (17 - len(line)) if len(line) < 17 else line
+    score = to_int_strict(line[16])
+    flags = [to_bool_int(value) for value in line[11:16]]
+    mask = participation(flags)
+    return (
+        line[0].strip() or None,
+        line[1].strip(),
+        line[2].strip(),
+        keep_str(line[3]),
+        line[4].strip(),
+        keep_str(line[5]),
+        keep_zip(line[6]),
+        to_date(line[7]),
+        to_date(line[8]),
+        clean_party(line[9]),
+        line[10].strip() or None,
+        *flags,
+        score if score is not None else 0,
+        mask,
+        bin(mask).count("1"),
+        digest,
+    )
+
+
+def parse_chunk(chunk):
+    """Parse a list of (lineno, row) pairs.
+
+    Returns (rows, errors) where errors is a list of (lineno, message) for
+    the rows that could not be converted; they are skipped, not fatal.
+    """
+    rows, errors = [], []
+    for lineno, line in chunk:
+        try:
+            rows.append(parse_row(line))
+        except Exception as e:
+            errors.append((lineno, f"{type(e).__name__}: {e}"))
+    return rows, errors
+
+
+def open_csv(path, encoding="utf-8"):
+    """Open a plain or gzip-compressed CSV file for reading as text."""
+    with open(path, "rb") as f:
+        magic = f.read(2)
+    if magic == b"\x1f\x8b":
+        return io.TextIOWrapper(gzip.open(path, "rb"), encoding=encoding, newline="")
+    return open(path, "r", encoding=encoding, newline="")
+
+
+def iter_chunks(f, chunk_size, skip_header=True):
+    """Yield lists of (lineno, row) pairs of at most chunk_size rows each."""
+    reader = csv.reader(f)
+    if skip_header:
+        next(reader, None)
+    chunk = []
+    for lineno, line in enumerate(reader, start=2 if skip_header else 1):
+        if not line:
+            continue
+        chunk.append((lineno, line))
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
@@ -0,0 +1,89 @@
+# File: voter_analytics/search.py
+# Author: María Díaz Garrido
+# Description: Full-text search over voter names and addresses. On SQLite it
+#              queries the FTS5 table voter_analytics_voter_fts, on PostgreSQL
+#              the GIN-indexed tsvector expression (both created by migration
+#              0008); other backends fall back to icontains.
+
+import re
+
+from django.db import connection
+from django.db.models import FloatField, Q
+from django.db.models.expressions import RawSQL
+
+from .models import Voter
+
+
+SEARCH_FIELDS = ("first_name", "last_name", "address_street_name", "address_zip_code")
+FTS_TABLE = "voter_analytics_voter_fts"
+
+# Must match the expression indexed by migration 0008 on PostgreSQL.
+PG_DOCUMENT = (
+    "to_tsvector('simple', coalesce(first_name, '') || ' ' || coalesce(last_name, '') || ' ' || "
+    "coalesce(address_street_name, '') || ' ' || coalesce(address_zip_code, ''))"
+)
+
+
+def search_terms(text):
+    """Split user input into word tokens, dropping FTS syntax characters."""
+    return re.findall(r"\w+", text or "")[:10]
+
+
+def _sqlite_match(terms):
+    # every term is a quoted prefix query: "smi"* matches SMITH, SMITHSON...
+    return " ".join('"{}"*'.format(t.replace('"', "")) for t in terms)
+
+
+def _pg_query(terms):
+    return " & ".join(f"{t}:*" for t in terms)
+
+
+def _sqlite_search(qs, terms):
+    """Join qs to the FTS5 matches; returns (queryset, bm25 rank, lower is better).
+
+    The MATCH runs once, as the driving table of the join: `+rowid` keeps
+    SQLite from looking the FTS table up per voter row, which re-runs the
+    whole MATCH for every candidate when the other filters look selective.
+    """
+    table = Voter._meta.db_table
+    qs = qs.extra(
+        tables=[FTS_TABLE],
+        where=[f"{table}.id = +{FTS_TABLE}.rowid", f"{FTS_TABLE} MATCH %s"],
+        params=[_sqlite_match(terms)],
+    )
+    return qs, RawSQL(f"bm25({FTS_TABLE})", [], output_field=FloatField()).asc()
+
+
+def _pg_search(qs, terms):
+    """Filter qs on the indexed tsvector; returns (queryset, ts_rank, higher is better)."""
+    query = _pg_query(terms)
+    qs = qs.extra(where=[f"{PG_DOCUMENT} @@ to_tsquery('simple', %s)"], params=[query])
+    rank = RawSQL(f"ts_rank({PG_DOCUMENT}, to_tsquery('simple', %s))", [query], output_field=FloatField())
+    return qs, rank.desc()
+
+
+def search_voters(qs, text):
+    """Restrict a Voter queryset to the matches for `text`, best match first.
+
+    The rank comes from the same single pass over the index that finds the
+    matches, so every match is ordered by relevance whatever the other
+    filters are, at the cost of one full-text lookup per query.
+    """
+    terms = search_terms(text)
+    if not terms:
+        return qs
+
+    if connection.vendor == "sqlite":
+        qs, rank = _sqlite_search(qs, terms)
+    elif connection.vendor == "postgresql":
+        qs, rank = _pg_search(qs, terms)
+    else:
+        q = Q()
+        for term in terms:
+            term_q = Q()
+            for field in SEARCH_FIELDS:
+                term_q |= Q(**{f"{field}__istartswith": term})
+            q &= term_q
+        return qs.filter(q)
+
+    return qs.order_by(rank, "last_name", "first_name", "id")
@@ -0,0 +1,33 @@
+# File: voter_analytics/signals.py
+# Author: María Díaz Garrido
+# Description: Signals for the voter_analytics app. `voters_loaded` is sent
+#              by the importer once a CSV has been fully loaded; everything
+#              derived from the Voter table refreshes itself from here.
+
+from django.dispatch import Signal, receiver
+
+
+# Sent with sender=Voter and stats=ImportStats after an import finishes.
+voters_loaded = Signal()
+
+
+@receiver(voters_loaded)
+def rebuild_summary(sender, **kwargs):
+    from .summary import rebuild_voter_summary
+    rebuild_voter_summary()
+
+
+@receiver(voters_loaded)
+def refresh_turnout(sender, stats=None, **kwargs):
+    from .summary import refresh_precinct_turnout
+    if stats is None or stats.truncated:
+        refresh_precinct_turnout()
+    else:
+        refresh_precinct_turnout(stats.precincts)
+
+
+@receiver(voters_loaded)
+def invalidate_caches(sender, **kwargs):
+    # connected last, so caches refill from the refreshed summary tables
+    from .caching import bump_data_version
+    bump_data_version()
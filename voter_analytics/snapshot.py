@@ -0,0 +1,137 @@
+# File: voter_analytics/snapshot.py
+# Author: María Díaz Garrido
+# Description: Optional in-process columnar copy of the Voter table as NumPy
+#              arrays (party code, birth year, score, participation bits).
+#              Graph aggregates for any VoterFilter are then a few vectorized
+#              boolean masks instead of a database query. The snapshot is
+#              loaded on first use and reloaded when the data version changes.
+#              Off by default (the VoterSummary table answers the same
+#              question); set VOTER_ANALYTICS_SNAPSHOT = True to turn it on.
+#              Needs numpy.
+
+import importlib.util
+import threading
+
+from django.conf import settings
+from django.db.models.functions import ExtractYear
+
+from .caching import data_version
+from .filters import ELECTION_FIELDS, election_mask
+from .models import Voter
+
+
+CHUNK_SIZE = 5000
+NO_YEAR = -1
+
+_local = {"token": None, "snapshot": None}
+_lock = threading.Lock()
+
+
+def snapshot_enabled():
+    """True when VOTER_ANALYTICS_SNAPSHOT is set and numpy is installed."""
+    if not getattr(settings, "VOTER_ANALYTICS_SNAPSHOT", False):
+        return False
+    return importlib.util.find_spec("numpy") is not None
+
+
+class VoterSnapshot:
+    """Column arrays for every voter, one entry per voter in each array."""
+
+    def __init__(self, parties, party, birth_year, voter_score, participation, participation_count):
+        import numpy as np
+
+        # parties[i] is the party whose code is i; ordered like the ORM
+        # orders them (no party first), so labels line up with the summary
+        self.parties = parties
+        self.party = np.asarray(party, dtype=np.uint8)
+        self.birth_year = np.asarray(birth_year, dtype=np.int16)
+        self.voter_score = np.asarray(voter_score, dtype=np.int32)
+        self.participation = np.asarray(participation, dtype=np.uint8)
+        self.participation_count = np.asarray(participation_count, dtype=np.uint8)
+
+    def __len__(self):
+        return len(self.party)
+
+    @classmethod
+    def load(cls):
+        """Read the needed Voter columns in chunks and pack them into arrays."""
+        rows = (
+            Voter.objects.annotate(birth_year=ExtractYear("date_birth"))
+                         .values_list("party", "birth_year", "voter_score",
+                                      "participation", "participation_count")
+                         .order_by()
+                         .iterator(chunk_size=CHUNK_SIZE)
+        )
+        codes = {}
+        party, birth_year, voter_score, participation, participation_count = [], [], [], [], []
+        for p, year, score, mask, count in rows:
+            party.append(codes.setdefault(p, len(codes)))
+            birth_year.append(NO_YEAR if year is None else year)
+            voter_score.append(score)
+            participation.append(mask)
+            participation_count.append(count)
+
+        # renumber the codes so they follow the sorted party order
+        parties = sorted(codes, key=lambda p: (p is not None, p or ""))
+        remap = [0] * len(codes)
+        for new, p in enumerate(parties):
+            remap[codes[p]] = new
+        party = [remap[code] for code in party]
+        return cls(parties, party, birth_year, voter_score, participation, participation_count)
+
+    def select(self, voter_filter):
+        """Boolean array of the voters matching voter_filter (same rules as VoterFilter.q())."""
+        import numpy as np
+
+        keep = np.ones(len(self), dtype=bool)
+        if voter_filter.party:
+            if voter_filter.party not in self.parties:
+                return np.zeros(len(self), dtype=bool)
+            keep &= self.party == self.parties.index(voter_filter.party)
+        if voter_filter.min_year is not None:
+            keep &= self.birth_year >= voter_filter.min_year
+        if voter_filter.max_year is not None:
+            keep &= (self.birth_year <= voter_filter.max_year) & (self.birth_year != NO_YEAR)
+        if voter_filter.voter_score is not None:
+            keep &= self.voter_score == voter_filter.voter_score
+        if voter_filter.elections:
+            mask = election_mask(voter_filter.elections)
+            if voter_filter.election_mode == "any":
+                keep &= (self.participation & mask) != 0
+            else:
+                keep &= (self.participation & mask) == mask
+        if voter_filter.min_elections:
+            keep &= self.participation_count >= voter_filter.min_elections
+        return keep
+
+    def aggregates(self, voter_filter):
+        """Same dict as summary.graph_aggregates(), computed from the arrays."""
+        import numpy as np
+
+        keep = self.select(voter_filter)
+        years, year_counts = np.unique(self.birth_year[keep & (self.birth_year != NO_YEAR)], return_counts=True)
+        party_counts = np.bincount(self.party[keep], minlength=len(self.parties))
+        participation = self.participation[keep]
+        return {
+            "n": int(keep.sum()),
+            "years": years.tolist(),
+            "year_counts": year_counts.tolist(),
+            "party_labels": [(self.parties[i] or "Unknown").strip() for i in np.flatnonzero(party_counts)],
+            "party_values": party_counts[party_counts > 0].tolist(),
+            "election_labels": list(ELECTION_FIELDS),
+            "election_values": [
+                int(np.count_nonzero(participation & (1 << bit))) for bit in range(len(ELECTION_FIELDS))
+            ],
+        }
+
+
+def voter_snapshot():
+    """The snapshot for the current data version, loading it if needed."""
+    token = data_version()["token"]
+    if _local["token"] == token:
+        return _local["snapshot"]
+    with _lock:
+        if _local["token"] != token:
+            _local["snapshot"] = VoterSnapshot.load()
+            _local["token"] = token
+    return _local["snapshot"]
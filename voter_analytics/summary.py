@@ -0,0 +1,144 @@
+# File: voter_analytics/summary.py
+# Author: María Díaz Garrido
+# Description: Builds and reads the VoterSummary table, a small pre-aggregated
+#              copy of Voter that answers every graphs-page filter combination
+#              without touching the full voter table, and the PrecinctTurnout
+#              rollup by precinct and ZIP code.
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import ExtractYear
+
+from .filters import ELECTION_FIELDS
+from .models import PrecinctTurnout, Voter, VoterSummary
+
+
+def rebuild_voter_summary():
+    """Recompute VoterSummary from Voter with a single GROUP BY. Returns the row count."""
+    groups = (
+        Voter.objects.annotate(birth_year=ExtractYear("date_birth"))
+                     .values("party", "birth_year", "voter_score", "participation")
+                     .annotate(voters=Count("id"), **{field: Sum(field) for field in ELECTION_FIELDS})
+                     .order_by()
+    )
+    rows = [
+        VoterSummary(
+            party=g["party"],
+            birth_year=g["birth_year"],
+            voter_score=g["voter_score"],
+            participation=g["participation"],
+            voters=g["voters"],
+            **{field: g[field] or 0 for field in ELECTION_FIELDS},
+        )
+        for g in groups
+    ]
+    with transaction.atomic():
+        VoterSummary.objects.all().delete()
+        VoterSummary.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def graph_aggregates(qs):
+    """Everything the graphs page plots, computed from a VoterSummary queryset."""
+    totals = qs.aggregate(n=Sum("voters"), **{field: Sum(field) for field in ELECTION_FIELDS})
+
+    yob = (
+        qs.exclude(birth_year__isnull=True)
+          .values("birth_year")
+          .annotate(c=Sum("voters"))
+          .order_by("birth_year")
+    )
+    party_rows = (
+        qs.values("party")
+          .annotate(c=Sum("voters"))
+          .order_by("party")
+    )
+    return {
+        "n": totals["n"] or 0,
+        "years": [row["birth_year"] for row in yob],
+        "year_counts": [row["c"] for row in yob],
+        "party_labels": [(r["party"] or "Unknown").strip() for r in party_rows],
+        "party_values": [r["c"] for r in party_rows],
+        "election_labels": list(ELECTION_FIELDS),
+        "election_values": [int(totals[field] or 0) for field in ELECTION_FIELDS],
+    }
+
+
+def _precinct_q(precincts, field="precinct_number"):
+    """Q matching any of `precincts`, where None stands for no precinct."""
+    named = [p for p in precincts if p is not None]
+    q = Q(**{f"{field}__in": named})
+    if None in precincts:
+        q |= Q(**{f"{field}__isnull": True})
+    return q
+
+
+def refresh_precinct_turnout(precincts=None):
+    """Recompute PrecinctTurnout for `precincts` (every precinct if None).
+
+    Returns the number of rows written.
+    """
+    voters = Voter.objects.all()
+    turnout = PrecinctTurnout.objects.all()
+    if precincts is not None:
+        if not precincts:
+            return 0
+        voters = voters.filter(_precinct_q(precincts))
+        turnout = turnout.filter(_precinct_q(precincts))
+
+    groups = (
+        voters.values("precinct_number", "address_zip_code", "party")
+              .annotate(voters=Count("id"), **{field: Sum(field) for field in ELECTION_FIELDS})
+              .order_by()
+    )
+    rows = [
+        PrecinctTurnout(
+            precinct_number=g["precinct_number"],
+            address_zip_code=g["address_zip_code"],
+            party=g["party"],
+            voters=g["voters"],
+            **{field: g[field] or 0 for field in ELECTION_FIELDS},
+        )
+        for g in groups
+    ]
+    with transaction.atomic():
+        turnout.delete()
+        PrecinctTurnout.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def turnout_report(by="precinct_number", precinct=None, zip_code=None):
+    """Turnout per precinct (or per ZIP code) from PrecinctTurnout.
+
+    Returns a list of dicts with the area, its voter count, its party split
+    and the turnout rate of every election.
+    """
+    qs = PrecinctTurnout.objects.all()
+    if precinct:
+        qs = qs.filter(precinct_number=precinct)
+    if zip_code:
+        qs = qs.filter(address_zip_code=zip_code)
+
+    areas = {}
+    for row in qs.order_by(by, "party"):
+        key = getattr(row, by)
+        area = areas.setdefault(key, {
+            "area": key,
+            "voters": 0,
+            "parties": {},
+            "votes": dict.fromkeys(ELECTION_FIELDS, 0),
+        })
+        area["voters"] += row.voters
+        party = (row.party or "Unknown").strip()
+        area["parties"][party] = area["parties"].get(party, 0) + row.voters
+        for field in ELECTION_FIELDS:
+            area["votes"][field] += getattr(row, field)
+
+    report = []
+    for area in areas.values():
+        voters = area.pop("voters")
+        votes = area.pop("votes")
+        area["voters"] = voters
+        area["turnout"] = {f: round(votes[f] / voters, 4) if voters else 0.0 for f in ELECTION_FIELDS}
+        report.append(area)
+    return report
@@ -1,3 +1,257 @@
-from django.test import TestCase
+import importlib.util
+import os
+import tempfile
+from datetime import date
+from unittest import skipUnless
 
-# Create your tests here.
+from django.db import connection
+from django.http import QueryDict
+from django.test import SimpleTestCase, TestCase
+
+from .filters import ELECTION_FIELDS, VoterFilter
+from .importer import ImportRefused, import_voters
+from .models import Voter, VoterSummary
+from .pagination import keyset_paginate
+from .search import search_voters
+from .snapshot import VoterSnapshot
+from .summary import graph_aggregates, rebuild_voter_summary
+
+
+HEADER = [
+    "Voter ID Number", "Last Name", "First Name", "Residential Address - Street Number",
+    "Residential Address - Street Name", "Residential Address - Apartment Number",
+    "Residential Address - Zip Code", "Date of Birth", "Date of Registration",
+    "Party Affiliation", "Precinct Number", "v20state", "v21town", "v21primary",
+    "v22general", "v23town", "voter_score",
+]
+
+
+def voter_row(voter_id, last_name, score="2"):
+    return [voter_id, last_name, "Ann", "1", "Main St", "", "01001", "1980-01-02",
+            "2000-03-04", "D", "1", "TRUE", "FALSE", "FALSE", "TRUE", "FALSE", score]
+
+
+class SyncTests(TestCase):
+
+    def write_csv(self, rows):
+        fd, path = tempfile.mkstemp(suffix=".csv")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            for row in [HEADER] + rows:
+                f.write(",".join(row) + "\n")
+        self.addCleanup(os.remove, path)
+        return path
+
+    def test_sync_with_a_bad_row_deletes_nothing(self):
+        import_voters(self.write_csv([voter_row("A1", "Able"), voter_row("B2", "Baker"), voter_row("C3", "Cole")]))
+
+        # B2's score cannot be parsed and C3 is gone from the file
+        stats = import_voters(self.write_csv([voter_row("A1", "Abel"), voter_row("B2", "Baker", score="²")]), sync=True)
+
+        self.assertEqual(len(stats.errors), 1)
+        self.assertTrue(stats.deletes_skipped)
+        self.assertEqual(stats.deleted, 0)
+        self.assertEqual(Voter.objects.get(voter_id="A1").last_name, "Abel")
+        self.assertEqual(
+            sorted(Voter.objects.values_list("last_name", flat=True)),
+            ["Abel", "Baker", "Cole"],
+        )
+
+    def test_clean_sync_deletes_missing_voters(self):
+        import_voters(self.write_csv([voter_row("A1", "Able"), voter_row("B2", "Baker")]))
+
+        stats = import_voters(self.write_csv([voter_row("A1", "Able")]), sync=True)
+
+        self.assertFalse(stats.deletes_skipped)
+        self.assertEqual((stats.created, stats.unchanged, stats.deleted), (0, 1, 1))
+        self.assertEqual(list(Voter.objects.values_list("last_name", flat=True)), ["Able"])
+
+    def test_sync_refuses_voters_without_an_id(self):
+        Voter.objects.create(voter_id=None, last_name="Legacy")
+        path = self.write_csv([voter_row("A1", "Legacy")])
+
+        with self.assertRaisesMessage(ImportRefused, "--truncate"):
+            import_voters(path, sync=True)
+        self.assertEqual(Voter.objects.count(), 1)
+
+    def test_append_refuses_a_loaded_table(self):
+        import_voters(self.write_csv([voter_row("A1", "Able")]))
+
+        with self.assertRaisesMessage(ImportRefused, "--sync"):
+            import_voters(self.write_csv([voter_row("B2", "Baker")]))
+        self.assertEqual(list(Voter.objects.values_list("voter_id", flat=True)), ["A1"])
+
+    def test_append_skips_repeated_ids(self):
+        stats = import_voters(self.write_csv([voter_row("A1", "Able"), voter_row("A1", "Again"), voter_row("B2", "Baker")]),
+                              chunk_size=1)
+
+        self.assertEqual(stats.created, 2)
+        self.assertEqual(stats.errors, [(None, "repeated voter id A1 skipped")])
+        self.assertEqual(sorted(Voter.objects.values_list("last_name", flat=True)), ["Able", "Baker"])
+
+
+@skipUnless(connection.vendor in ("sqlite", "postgresql"), "needs the full-text index")
+class SearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        def voter(last_name, first_name, street, party):
+            return Voter.objects.create(last_name=last_name, first_name=first_name,
+                                        address_street_name=street, address_zip_code="01001", party=party)
+
+        cls.both = voter("Smith", "Ann", "Smith St", "D")         # matches in two columns
+        cls.name_b = voter("Smith", "Bob", "Main St", "D")
+        cls.name_a = voter("Smith", "Abe", "Main St", "D")
+        cls.other_party = voter("Smith", "Cal", "Smith St", "R")
+        cls.no_match = voter("Jones", "Dee", "Main St", "D")
+        for i in range(20):
+            voter(f"Filler{i}", "Eve", "Elm St", "D")
+
+    def test_filtered_search_orders_by_relevance_then_name(self):
+        qs = search_voters(Voter.objects.filter(party="D"), "smi")
+
+        self.assertEqual(list(qs), [self.both, self.name_a, self.name_b])
+        self.assertEqual(qs.count(), 3)
+        self.assertEqual(list(qs[1:2]), [self.name_a])
+
+    def test_every_term_must_match(self):
+        self.assertEqual(list(search_voters(Voter.objects.all(), "smith cal")), [self.other_party])
+        self.assertEqual(list(search_voters(Voter.objects.filter(party="D"), "smith cal")), [])
+
+
+class VoterFilterTests(SimpleTestCase):
+
+    # query strings that mean the same filter, and its canonical params
+    EQUIVALENT = [
+        (["party=D", "party=d", "party=+d+"], [("party", "D")]),
+        (["voter_score=3", "score=3", "score=3&voter_score="], [("voter_score", "3")]),
+        (
+            ["v20state=on&v22general=on", "elections=v22general&elections=v20state",
+             "v22general=true&v20state=1", "v20state=on&v22general=on&election_mode=all"],
+            [("v20state", "on"), ("v22general", "on")],
+        ),
+        (
+            ["v21town=on&election_mode=any", "elections=v21town&election_mode=any"],
+            [("v21town", "on"), ("election_mode", "any")],
+        ),
+        (["min_year=1960&max_year=1980", "max_year=1980&min_year=1960"],
+         [("min_year", "1960"), ("max_year", "1980")]),
+        # malformed or meaningless values are not filtered on
+        (["", "party=DEM", "min_year=abc", "min_elections=9", "election_mode=any",
+          "voter_score=-1", "v20state=off", "elections=v99"], []),
+    ]
+
+    def test_equivalent_queries_share_params_and_digest(self):
+        for queries, params in self.EQUIVALENT:
+            filters = [VoterFilter.from_query(QueryDict(query)) for query in queries]
+            for query, voter_filter in zip(queries, filters):
+                with self.subTest(query=query):
+                    self.assertEqual(voter_filter.params(), params)
+                    self.assertEqual(voter_filter.digest, filters[0].digest)
+
+    def test_params_round_trip(self):
+        for queries, params in self.EQUIVALENT:
+            voter_filter = VoterFilter.from_query(QueryDict(queries[0]))
+            with self.subTest(query=queries[0]):
+                self.assertEqual(VoterFilter.from_query(QueryDict(voter_filter.querystring())), voter_filter)
+
+
+def make_voters():
+    """One voter per participation mask, with varied party, birth year and score."""
+    parties = ["D", "R", None, "U"]
+    voters = []
+    for mask in range(1 << len(ELECTION_FIELDS)):
+        flags = {field: (mask >> bit) & 1 for bit, field in enumerate(ELECTION_FIELDS)}
+        voters.append(Voter(
+            voter_id=f"P{mask}", last_name="Same" if mask % 3 else f"Name{mask % 5}", first_name="Ann",
+            party=parties[mask % 4], date_birth=None if mask % 7 == 0 else date(1950 + mask, 1, 1),
+            voter_score=mask % 3, participation=mask, participation_count=bin(mask).count("1"), **flags,
+        ))
+    return Voter.objects.bulk_create(voters)
+
+
+def matches(voter, voter_filter):
+    """Plain-Python reading of what a VoterFilter selects, to test the Qs against."""
+    year = voter.date_birth.year if voter.date_birth else None
+    voted = {field for field in ELECTION_FIELDS if getattr(voter, field)}
+    checked = set(voter_filter.elections)
+    return all([
+        voter_filter.party is None or voter.party == voter_filter.party,
+        voter_filter.min_year is None or (year is not None and year >= voter_filter.min_year),
+        voter_filter.max_year is None or (year is not None and year <= voter_filter.max_year),
+        voter_filter.voter_score is None or voter.voter_score == voter_filter.voter_score,
+        not checked or (voted & checked if voter_filter.election_mode == "any" else checked <= voted),
+        not voter_filter.min_elections or len(voted) >= voter_filter.min_elections,
+    ])
+
+
+FILTER_QUERIES = [
+    "",
+    "party=D",
+    "party=r&min_year=1970",
+    "max_year=1969",
+    "score=2",
+    "v20state=on",
+    "v20state=on&v23town=on",
+    "v20state=on&v23town=on&election_mode=any",
+    "min_elections=3",
+    "v21town=on&v22general=on&election_mode=any&min_elections=2&party=U",
+    "elections=v21primary&min_elections=5",
+]
+
+
+class ParticipationFilterTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.voters = make_voters()
+        rebuild_voter_summary()
+
+    def test_voter_q_matches_the_plain_reading(self):
+        for query in FILTER_QUERIES:
+            voter_filter = VoterFilter.from_query(QueryDict(query))
+            expected = sorted(v.pk for v in self.voters if matches(v, voter_filter))
+            with self.subTest(query=query):
+                self.assertEqual(sorted(Voter.objects.filter(voter_filter.q()).values_list("pk", flat=True)), expected)
+
+    def test_summary_q_counts_the_same_voters(self):
+        for query in FILTER_QUERIES:
+            voter_filter = VoterFilter.from_query(QueryDict(query))
+            summary = graph_aggregates(VoterSummary.objects.filter(voter_filter.summary_q()))
+            with self.subTest(query=query):
+                self.assertEqual(summary["n"], Voter.objects.filter(voter_filter.q()).count())
+
+    @skipUnless(importlib.util.find_spec("numpy"), "needs numpy")
+    def test_snapshot_matches_the_summary_table(self):
+        snapshot = VoterSnapshot.load()
+        for query in FILTER_QUERIES:
+            voter_filter = VoterFilter.from_query(QueryDict(query))
+            with self.subTest(query=query):
+                self.assertEqual(
+                    snapshot.aggregates(voter_filter),
+                    graph_aggregates(VoterSummary.objects.filter(voter_filter.summary_q())),
+                )
+
+
+class KeysetPaginationTests(TestCase):
+
+    ORDERING = ("last_name", "first_name", "id")
+
+    @classmethod
+    def setUpTestData(cls):
+        make_voters()   # many share last and first name: only the id breaks the tie
+
+    def test_next_then_previous_round_trip(self):
+        qs = Voter.objects.filter(party__isnull=False)
+        expected = list(qs.order_by(*self.ORDERING).values_list("pk", flat=True))
+
+        pages = [keyset_paginate(qs, self.ORDERING, 5)]
+        while pages[-1].has_next:
+            pages.append(keyset_paginate(qs, self.ORDERING, 5, pages[-1].next_cursor))
+        self.assertEqual([v.pk for page in pages for v in page], expected)
+        self.assertFalse(pages[0].has_previous)
+
+        back = [pages[-1]]
+        while back[-1].has_previous:
+            back.append(keyset_paginate(qs, self.ORDERING, 5, back[-1].previous_cursor))
+        self.assertEqual([[v.pk for v in page] for page in reversed(back)],
+                         [[v.pk for v in page] for page in pages])
@@ -4,6 +4,10 @@ from .views import *
 
 urlpatterns = [
     path('', VoterListView.as_view(), name="voters"),
+    path('export', VoterExportView.as_view(), name="voters_export"),
     path('voter/<int:pk>/', VoterDetailView.as_view(), name="voter"),
     path("graphs/", VoterGraphsView.as_view(), name="graphs"),
+    path("graphs/precincts/", PrecinctTurnoutView.as_view(), name="precincts"),
+    path("api/aggregates", VoterAggregatesAPIView.as_view(), name="api_aggregates"),
+    path("api/turnout", PrecinctTurnoutAPIView.as_view(), name="api_turnout"),
 ]
\ No newline at end of file
@@ -1,12 +1,21 @@
 from django.shortcuts import render
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
-from .models import Voter
+from .models import PrecinctTurnout, Voter, VoterSummary
 from .forms import VoterFilterForm
-from django.db.models import Count, Sum
-from django.db.models.functions import ExtractYear
-from plotly.offline import plot
-import plotly.graph_objects as go
-from plotly.io import to_html
+from .filters import VoterFilter
+from .summary import graph_aggregates, turnout_report
+from .caching import data_version, versioned_key
+from .choices import filter_choices
+from django.core.cache import cache
+import hashlib
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+from .pagination import CachedCountPaginator, InvalidCursor, cached_count, keyset_paginate
+from django.http import Http404, HttpResponseBadRequest, StreamingHttpResponse
+from django.views.generic import View
+from .export import iter_columnar, iter_csv
+from .search import search_voters
+from .snapshot import snapshot_enabled, voter_snapshot
 from django.utils.http import urlencode
 
 # Create your views here.
@@ -16,101 +25,155 @@ class VoterListView(ListView):
     template_name = "voter_analytics/voter_list.html"
     context_object_name = "voters"
     paginate_by = 100
-    ordering = ["last_name", "first_name"]
+    ordering = ["last_name", "first_name", "id"]
+    paginator_class = CachedCountPaginator
 
-    def get_queryset(self):
-        qs = super().get_queryset()
-        self.filter_form = VoterFilterForm(self.request.GET or None)
-
-        if self.filter_form.is_valid():
-            cd = self.filter_form.cleaned_data
-
-            if cd.get("party"):
-                qs = qs.filter(party=cd["party"])
+    def count_cache_key(self):
+        return versioned_key("count", self.voter_filter.digest, self.search)
 
-            if cd.get("min_year"):
-                qs = qs.filter(date_birth__year__gte=int(cd["min_year"]))
+    def cursor_mode(self):
+        """Keyset pagination is opt-in with ?paging=cursor (not for ranked searches)."""
+        return self.request.GET.get("paging") == "cursor" and not self.search
 
-            if cd.get("max_year"):
-                qs = qs.filter(date_birth__year__lte=int(cd["max_year"]))
+    def get_paginator(self, queryset, per_page, **kwargs):
+        return super().get_paginator(queryset, per_page, count_cache_key=self.count_cache_key(), **kwargs)
 
-            if cd.get("voter_score"):
-                qs = qs.filter(voter_score=int(cd["voter_score"]))
+    def paginate_queryset(self, queryset, page_size):
+        if not self.cursor_mode():
+            return super().paginate_queryset(queryset, page_size)
+        try:
+            page = keyset_paginate(queryset, self.ordering, page_size, self.request.GET.get("cursor"))
+        except InvalidCursor:
+            raise Http404("Invalid cursor.")
+        return (None, page, page.object_list, page.has_next or page.has_previous)
 
-            for field in cd.get("elections", []):
-                qs = qs.filter(**{field: 1})
+    def cursor_url(self, cursor):
+        return "?" + urlencode(self.voter_filter.params() + [("paging", "cursor"), ("cursor", cursor)])
 
+    def get_queryset(self):
+        self.voter_filter = VoterFilter.from_query(self.request.GET)
+        # the form only renders the filter controls; VoterFilter does the parsing
+        self.filter_form = VoterFilterForm(self.request.GET or None)
+        self.search = (self.request.GET.get("q") or "").strip()
+        qs = super().get_queryset().filter(self.voter_filter.q())
+        if self.search:
+            qs = search_voters(qs, self.search)
         return qs
 
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
         ctx["form"] = getattr(self, "filter_form", VoterFilterForm())
+        ctx["export_query"] = urlencode(self.voter_filter.params() + ([("q", self.search)] if self.search else []))
+        if self.cursor_mode():
+            page = ctx["page_obj"]
+            ctx["cursor_mode"] = True
+            ctx["total_count"] = cached_count(self.object_list, self.count_cache_key())
+            ctx["next_url"] = page.next_cursor and self.cursor_url(page.next_cursor)
+            ctx["previous_url"] = page.previous_cursor and self.cursor_url(page.previous_cursor)
+            ctx["first_url"] = "?" + urlencode(self.voter_filter.params() + [("paging", "cursor")])
         return ctx
 
 
+class VoterExportView(View):
+    """
+    Download the voters matching the list filters, streamed.
+    ?format=csv (default), parquet or arrow; the last two need pyarrow.
+    """
+    FORMATS = {
+        "csv": ("text/csv", "csv"),
+        "parquet": ("application/vnd.apache.parquet", "parquet"),
+        "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+    }
+
+    def get(self, request, *args, **kwargs):
+        fmt = request.GET.get("format", "csv")
+        if fmt not in self.FORMATS:
+            return HttpResponseBadRequest(f"Unknown export format: {fmt}")
+
+        # VoterFilter quietly drops values it cannot parse, which here would
+        # mean exporting every voter; refuse malformed filters instead
+        data = request.GET.copy()
+        if "score" in data and "voter_score" not in data:
+            data["voter_score"] = data["score"]
+        form = VoterFilterForm(data)
+        if not form.is_valid():
+            return HttpResponseBadRequest("Invalid filters:\n" + form.errors.as_text(), content_type="text/plain")
+
+        qs = Voter.objects.filter(VoterFilter.from_query(request.GET).q())
+        search = (request.GET.get("q") or "").strip()
+        if search:
+            qs = search_voters(qs, search)
+        if fmt == "csv":
+            content = iter_csv(qs)
+        else:
+            try:
+                content = iter_columnar(qs, fmt)
+            except ImportError:
+                return HttpResponseBadRequest(f"{fmt} export requires pyarrow to be installed.")
+
+        content_type, extension = self.FORMATS[fmt]
+        response = StreamingHttpResponse(content, content_type=content_type)
+        response["Content-Disposition"] = f'attachment; filename="voters.{extension}"'
+        return response
+
+
 class VoterDetailView(DetailView):
     model = Voter
     template_name = "voter_analytics/voter_detail.html"
     context_object_name = "voter"
     
     
+AGGREGATES_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def graphs_etag(request, *args, **kwargs):
+    # the versioned cache key already identifies data version + filters
+    key = versioned_key("aggregates", VoterFilter.from_query(request.GET).digest)
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+
+def graphs_last_modified(request, *args, **kwargs):
+    return data_version()["updated"]
+
+
+def compute_graph_aggregates(voter_filter):
+    """Graph aggregates from the in-memory snapshot, or from VoterSummary without numpy."""
+    if snapshot_enabled():
+        return voter_snapshot().aggregates(voter_filter)
+    return graph_aggregates(VoterSummary.objects.filter(voter_filter.summary_q()))
+
+
+def cached_graph_aggregates(voter_filter):
+    """Graph aggregates for a VoterFilter, cached per data version."""
+    key = versioned_key("aggregates", voter_filter.digest)
+    return cache.get_or_set(key, lambda: compute_graph_aggregates(voter_filter), AGGREGATES_CACHE_TIMEOUT)
+
+
+@method_decorator(condition(etag_func=graphs_etag, last_modified_func=graphs_last_modified), name="get")
 class VoterGraphsView(ListView):
     """
     Graphs page (reuse ListView per spec). Uses filter form from Task 2 to
-    restrict the queryset and then draws Plotly graphs for the filtered set.
+    restrict the queryset; the page itself only carries the filters, and the
+    browser draws the Plotly graphs from the aggregates API for the same
+    query string. ETag / Last-Modified let browsers revalidate with a 304.
     """
-    model = Voter
+    model = VoterSummary
     template_name = "voter_analytics/graphs.html"
-    context_object_name = "voters"
+    context_object_name = "summary"
     paginate_by = 0  
 
     def get_queryset(self):
-        qs = Voter.objects.all()
-        g = self.request.GET
-
-        if g.get("party"):
-            qs = qs.filter(party=g["party"])
-
-        if g.get("min_year"):
-            qs = qs.filter(date_birth__year__gte=int(g["min_year"]))
-
-        if g.get("max_year"):
-            qs = qs.filter(date_birth__year__lte=int(g["max_year"]))
-
-        if g.get("score"):
-            qs = qs.filter(voter_score=int(g["score"]))
-
-        for f in ("v20state", "v21town", "v21primary", "v22general", "v23town"):
-            if g.get(f) == "on":
-                qs = qs.filter(**{f: 1})
-
-        return qs
+        self.voter_filter = VoterFilter.from_query(self.request.GET)
+        return VoterSummary.objects.filter(self.voter_filter.summary_q())
 
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
-        qs = ctx["voters"]
-        n = qs.count()
 
         # ----- choices for filters (reuse Task 2) -----
-        ctx["party_choices"] = (
-            Voter.objects.exclude(party__isnull=True)
-                         .exclude(party__exact="")
-                         .values_list("party", flat=True)
-                         .distinct()
-                         .order_by("party")
-        )
-        ctx["year_choices"] = (
-            Voter.objects.exclude(date_birth__isnull=True)
-                         .annotate(y=ExtractYear("date_birth"))
-                         .values_list("y", flat=True)
-                         .distinct()
-                         .order_by("y")
-        )
-        ctx["score_choices"] = (
-            Voter.objects.values_list("voter_score", flat=True)
-                         .distinct()
-                         .order_by("voter_score")
-        )
+        choices = filter_choices()
+        ctx["party_choices"] = choices["party"]
+        ctx["year_choices"] = choices["year"]
+        ctx["score_choices"] = choices["score"]
         ctx["election_filters"] = [
             ("v20state",   "2020 State"),
             ("v21town",    "2021 Town"),
@@ -118,74 +181,80 @@ class VoterGraphsView(ListView):
             ("v22general", "2022 General"),
             ("v23town",    "2023 Town"),
         ]
-        ctx["checked_elections"] = {
-            k for k in self.request.GET.keys()
-            if k in {f for f, _ in ctx["election_filters"]}
-        }
-
-        if n == 0:
-            ctx["birth_hist_html"] = ctx["party_pie_html"] = ctx["elections_bar_html"] = ""
-            ctx["empty_msg"] = "No data for the selected filters."
-            return ctx
-
-        # ----- Graph 1: Year-of-birth histogram -----
-        yob = (
-            qs.exclude(date_birth__isnull=True)
-              .annotate(y=ExtractYear("date_birth"))
-              .values("y")
-              .annotate(c=Count("id"))
-              .order_by("y")
-        )
-        years = [row["y"] for row in yob]
-        counts = [row["c"] for row in yob]
-
-        fig_birth = go.Figure(data=[go.Bar(x=years, y=counts)])
-        fig_birth.update_layout(
-            title=f"Voter distribution by Year of Birth (n={n})",
-            xaxis_title="Year of birth",
-            yaxis_title="Count",
-            bargap=0.05,
-            margin=dict(l=40, r=20, t=60, b=40),
-            height=420,
-        )
-        ctx["birth_hist_html"] = to_html(fig_birth, full_html=False, include_plotlyjs="cdn")
-
-        # ----- Graph 2: Party affiliation pie -----
-        party_rows = (
-            qs.values("party")
-              .annotate(c=Count("id"))
-              .order_by("party")
-        )
-        party_labels = [ (r["party"] or "Unknown").strip() for r in party_rows ]
-        party_values = [ r["c"] for r in party_rows ]
-
-        fig_party = go.Figure(data=[go.Pie(labels=party_labels, values=party_values, hole=0)])
-        fig_party.update_layout(
-            title=f"Voter distribution by Party Affiliation (n={n})",
-            margin=dict(l=40, r=20, t=60, b=40),
-            height=420,
-        )
-        ctx["party_pie_html"] = to_html(fig_party, full_html=False, include_plotlyjs=False)
-
-        # ----- Graph 3: Vote count by election -----
-        agg = qs.aggregate(
-            v20state=Sum("v20state"),
-            v21town=Sum("v21town"),
-            v21primary=Sum("v21primary"),
-            v22general=Sum("v22general"),
-            v23town=Sum("v23town"),
-        )
-        vote_labels = ["v20state", "v21town", "v21primary", "v22general", "v23town"]
-        vote_values = [int(agg[k] or 0) for k in vote_labels]
-
-        fig_votes = go.Figure(data=[go.Bar(x=vote_labels, y=vote_values)])
-        fig_votes.update_layout(
-            title=f"Vote Count by Election (n={n})",
-            xaxis_title="Election",
-            yaxis_title="Count voted (1=Yes)",
-            margin=dict(l=40, r=20, t=60, b=40),
-            height=420,
-        )
-        ctx["elections_bar_html"] = to_html(fig_votes, full_html=False, include_plotlyjs=False)
-
-        return ctx
\ No newline at end of file
+        # render the controls from the canonical filter, the same one the
+        # ETag and the aggregates cache key are computed from
+        ctx["filter_params"] = dict(self.voter_filter.params())
+        ctx["checked_elections"] = set(self.voter_filter.elections)
+        ctx["aggregates_query"] = self.voter_filter.querystring()
+        return ctx
+
+
+TURNOUT_AREAS = {"precinct": "precinct_number", "zip": "address_zip_code"}
+
+
+def turnout_params(query):
+    """(by, precinct, zip_code) from a query dict; by is 'precinct' or 'zip'."""
+    by = query.get("by") if query.get("by") in TURNOUT_AREAS else "precinct"
+    return by, (query.get("precinct") or "").strip(), (query.get("zip") or "").strip()
+
+
+def cached_turnout_report(by, precinct="", zip_code=""):
+    """turnout_report() for one grouping and filter pair, cached per data version."""
+    key = versioned_key("turnout", by, precinct, zip_code)
+    return cache.get_or_set(
+        key,
+        lambda: turnout_report(TURNOUT_AREAS[by], precinct or None, zip_code or None),
+        AGGREGATES_CACHE_TIMEOUT,
+    )
+
+
+class PrecinctTurnoutView(ListView):
+    """
+    Turnout by precinct or ZIP code (?by=precinct|zip, optional ?precinct=
+    and ?zip= filters), read from the precomputed PrecinctTurnout table.
+    The table is rendered here; the browser charts it from the turnout API.
+    """
+    model = PrecinctTurnout
+    template_name = "voter_analytics/precinct_turnout.html"
+    context_object_name = "areas"
+
+    def get_queryset(self):
+        self.by, self.precinct, self.zip_code = turnout_params(self.request.GET)
+        return cached_turnout_report(self.by, self.precinct, self.zip_code)
+
+    def get_context_data(self, **kwargs):
+        ctx = super().get_context_data(**kwargs)
+        ctx["by"] = self.by
+        ctx["precinct"] = self.precinct
+        ctx["zip"] = self.zip_code
+        ctx["election_labels"] = ["2020 State", "2021 Town", "2021 Primary", "2022 General", "2023 Town"]
+        ctx["turnout_query"] = urlencode([("by", self.by), ("precinct", self.precinct), ("zip", self.zip_code)])
+        return ctx
+
+
+#####################################################################################################################################
+# REST API
+
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+
+@method_decorator(condition(etag_func=graphs_etag, last_modified_func=graphs_last_modified), name="get")
+class VoterAggregatesAPIView(APIView):
+    """
+    GET -> histogram, party and election arrays for the graphs filters
+           (party, min_year, max_year, score, v20state=on, ...,
+           election_mode=all|any, min_elections=K)
+    """
+    def get(self, request, *args, **kwargs):
+        return Response(cached_graph_aggregates(VoterFilter.from_query(request.GET)))
+
+
+class PrecinctTurnoutAPIView(APIView):
+    """
+    GET -> [{area, voters, parties: {party: voters}, turnout: {election: rate}}]
+           grouped by ?by=precinct (default) or ?by=zip, optionally
+           restricted with ?precinct= and ?zip=
+    """
+    def get(self, request, *args, **kwargs):
+        return Response(cached_turnout_report(*turnout_params(request.GET)))